@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Caché en memoria con un tiempo de vida (TTL) independiente por entrada y tamaño acotado (LRU)"""
+
+    def __init__(self, maxsize: int = 512):
+        """Inicializar la caché vacía con un máximo de `maxsize` entradas"""
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[float, Any]]:
+        """Obtener el instante de caducidad (time.monotonic) y el valor de una clave si existe y no ha expirado"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        if time.monotonic() >= entry[0]:
+            # Entrada caducada: eliminarla para no volver a comprobarla
+            self._data.pop(key, None)
+            return None
+
+        # Marcar la entrada como usada recientemente
+        self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener el valor asociado a una clave si existe y no ha expirado"""
+        entry = self.get_entry(key)
+        return default if entry is None else entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> float:
+        """Guardar un valor que caducará pasados `ttl` segundos y devolver su instante de caducidad"""
+        expires_at = time.monotonic() + ttl
+        self.set_until(key, value, expires_at)
+        return expires_at
+
+    def set_until(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """Guardar un valor que caducará en el instante `expires_at` (según time.monotonic)"""
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            # Descartar la entrada usada hace más tiempo
+            self._data.popitem(last=False)
+
+    def invalidate(self, *prefixes: Hashable) -> None:
+        """Eliminar las entradas cuyas claves (tuplas) empiezan por alguno de los prefijos, o todas si no se indica ninguno"""
+        if not prefixes:
+            self._data.clear()
+            return
+
+        stale = [
+            key for key in self._data
+            if isinstance(key, tuple) and key and key[0] in prefixes
+        ]
+        for key in stale:
+            del self._data[key]
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -1,7 +1,14 @@
-from typing import Annotated, List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Annotated, Awaitable, Callable, List, Dict, Any, Literal, Optional
 import os
+import sys
 import asyncio
-from pydantic import BaseModel, Field
+import inspect
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pydantic import BaseModel, ConfigDict, Field
 
 from mcp.shared.exceptions import McpError
 from mcp.server import Server
@@ -18,55 +25,113 @@ from mcp.types import (
     INTERNAL_ERROR,
 )
 
-from devops_tools import AzureDevOpsTool
+from devops_cache import TTLCache
+from formatters import (
+    _EMPTY,
+    branch_name,
+    format_history_entry,
+    format_pipeline_summary,
+    format_pull_request_summary,
+    format_repository_summary,
+    format_work_item_summary,
+)
+
+if TYPE_CHECKING:
+    # Solo para anotaciones: el cliente se importa dentro de serve() para no pagar el
+    # coste de importar requests/dateutil/dotenv al cargar el módulo
+    from devops_tools import AzureDevOpsTool
+
+# El transporte stdio usa stdout como canal del protocolo MCP, así que los mensajes
+# de diagnóstico se emiten siempre por logging (stderr)
+logger = logging.getLogger(__name__)
+
+
+# Valores admitidos por Azure DevOps para el estado de un pull request
+PullRequestStatus = Literal["active", "abandoned", "completed", "all"]
+
+# Tipos de relación estándar entre work items en Azure DevOps
+WorkItemLinkType = Literal[
+    "System.LinkTypes.Related",
+    "System.LinkTypes.Hierarchy-Forward",
+    "System.LinkTypes.Hierarchy-Reverse",
+    "System.LinkTypes.Dependency-Forward",
+    "System.LinkTypes.Dependency-Reverse",
+    "System.LinkTypes.Duplicate-Forward",
+    "System.LinkTypes.Duplicate-Reverse",
+    "Microsoft.VSTS.Common.TestedBy-Forward",
+    "Microsoft.VSTS.Common.TestedBy-Reverse",
+    "Microsoft.VSTS.Common.Affects-Forward",
+    "Microsoft.VSTS.Common.Affects-Reverse",
+]
 
+# Parámetros de paginación comunes a las herramientas que devuelven listas
+Page = Annotated[int, Field(default=1, ge=1, description="Número de página (empieza en 1)")]
+PageSize = Annotated[int, Field(default=50, ge=1, le=500, description="Número de elementos por página")]
 
-class WorkItemsQuery(BaseModel):
+
+class ToolArguments(BaseModel):
+    """Base de los modelos de entrada de las herramientas.
+
+    Los argumentos nunca se modifican tras validarlos, por lo que las instancias son
+    inmutables (y hashables, para usarlas como clave de la caché de respuestas).
+    """
+    model_config = ConfigDict(frozen=True)
+
+
+class WorkItemsQuery(ToolArguments):
     """Parámetros para consultar work items."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_type: Annotated[Optional[str], Field(default=None, description="Tipo de work item (Epic, User Story, Task, Bug, etc.)")] 
     date_filter: Annotated[Optional[str], Field(default=None, description="Filtro de fecha en lenguaje natural (ej. 'today', 'last week', 'last 30 days', '2023-01-01 to 2023-01-31')")] 
     state: Annotated[Optional[str], Field(default=None, description="Estado del work item (Active, Closed, etc.)")] 
     query_string: Annotated[Optional[str], Field(default=None, description="Consulta WIQL personalizada (si se proporciona, ignora otros filtros)")] 
+    page: Page
+    page_size: PageSize
 
 
-class ProjectsQuery(BaseModel):
+class ProjectsQuery(ToolArguments):
     """Parámetros para listar proyectos."""
     organization: Annotated[Optional[str], Field(default=None, description="Nombre o URL de la organización de Azure DevOps (opcional si está configurada en las variables de entorno)")] 
 
 
-class RepositoriesQuery(BaseModel):
+class RepositoriesQuery(ToolArguments):
     """Parámetros para listar repositorios."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     date_filter: Annotated[Optional[str], Field(default=None, description="Filtro de fecha en lenguaje natural (ej. 'today', 'last week', 'last 30 days', '2023-01-01 to 2023-01-31')")] 
+    page: Page
+    page_size: PageSize
 
 
-class PipelinesQuery(BaseModel):
+class PipelinesQuery(ToolArguments):
     """Parámetros para listar pipelines."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     date_filter: Annotated[Optional[str], Field(default=None, description="Filtro de fecha en lenguaje natural (ej. 'today', 'last week', 'last 30 days', '2023-01-01 to 2023-01-31')")] 
+    page: Page
+    page_size: PageSize
 
 
-class PullRequestsQuery(BaseModel):
+class PullRequestsQuery(ToolArguments):
     """Parámetros para listar pull requests."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     repository_id: Annotated[Optional[str], Field(default=None, description="ID del repositorio (opcional para listar PRs en todo el proyecto)")] 
-    status: Annotated[Optional[str], Field(default="active", description="Estado del PR: active, abandoned, completed, all")] 
+    status: Annotated[PullRequestStatus, Field(default="active", description="Estado del PR: active, abandoned, completed, all")] 
+    page: Page
+    page_size: PageSize
 
 
-class WorkItemQuery(BaseModel):
+class WorkItemQuery(ToolArguments):
     """Parámetros para obtener un work item específico."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item a consultar")]
 
 
-class RepositoryQuery(BaseModel):
+class RepositoryQuery(ToolArguments):
     """Parámetros para obtener un repositorio específico."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     repository_id: Annotated[str, Field(description="ID del repositorio")]
 
 
-class FileContentQuery(BaseModel):
+class FileContentQuery(ToolArguments):
     """Parámetros para obtener el contenido de un archivo."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     repository_id: Annotated[str, Field(description="ID del repositorio")]
@@ -74,7 +139,7 @@ class FileContentQuery(BaseModel):
     branch: Annotated[Optional[str], Field(default="main", description="Rama del repositorio (default: main)")]
 
 
-class PullRequestCreateModel(BaseModel):
+class PullRequestCreateModel(ToolArguments):
     """Parámetros para crear un pull request."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     repository_id: Annotated[str, Field(description="ID del repositorio")]
@@ -84,7 +149,7 @@ class PullRequestCreateModel(BaseModel):
     description: Annotated[str, Field(description="Descripción detallada del pull request")]
 
 
-class PullRequestCommentCreate(BaseModel):
+class PullRequestCommentCreate(ToolArguments):
     """Parámetros para añadir un comentario a un pull request."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     repository_id: Annotated[str, Field(description="ID del repositorio")]
@@ -93,7 +158,7 @@ class PullRequestCommentCreate(BaseModel):
     thread_id: Annotated[Optional[int], Field(default=None, description="ID del hilo de comentarios (para responder a un comentario existente)")]
 
 
-class WorkItemCreateModel(BaseModel):
+class WorkItemCreateModel(ToolArguments):
     """Parámetros para crear un nuevo work item."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     title: Annotated[str, Field(description="Título del work item")]
@@ -103,7 +168,7 @@ class WorkItemCreateModel(BaseModel):
     tags: Annotated[Optional[str], Field(default=None, description="Etiquetas separadas por punto y coma (ej. 'tag1; tag2; tag3')")]
 
 
-class WorkItemUpdateModel(BaseModel):
+class WorkItemUpdateModel(ToolArguments):
     """Parámetros para actualizar un work item existente."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item a actualizar")]
@@ -114,857 +179,962 @@ class WorkItemUpdateModel(BaseModel):
     tags: Annotated[Optional[str], Field(default=None, description="Nuevas etiquetas separadas por punto y coma")]
 
 
-class WorkItemCommentModel(BaseModel):
+class WorkItemCommentModel(ToolArguments):
     """Parámetros para añadir un comentario a un work item."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item")]
     comment: Annotated[str, Field(description="Texto del comentario a añadir")]
 
 
-class WorkItemLinkModel(BaseModel):
+class WorkItemLinkModel(ToolArguments):
     """Parámetros para vincular dos work items."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     source_id: Annotated[int, Field(description="ID del work item origen")]
     target_id: Annotated[int, Field(description="ID del work item destino")]
-    rel: Annotated[Optional[str], Field(default="System.LinkTypes.Related", description="Tipo de relación")]
+    rel: Annotated[WorkItemLinkType, Field(default="System.LinkTypes.Related", description="Tipo de relación")]
     comment: Annotated[Optional[str], Field(default=None, description="Comentario sobre la relación")]
 
 
-class WorkItemCloneModel(BaseModel):
+class WorkItemCloneModel(ToolArguments):
     """Parámetros para clonar un work item."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item a clonar")]
     new_title: Annotated[str, Field(description="Título para el nuevo work item clonado")]
 
 
-class WorkItemHistoryQuery(BaseModel):
+class WorkItemHistoryQuery(ToolArguments):
     """Parámetros para obtener el historial de un work item."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item")]
+    page: Page
+    page_size: PageSize
 
 
-class WorkItemTagsModel(BaseModel):
+class WorkItemTagsModel(ToolArguments):
     """Parámetros para actualizar etiquetas de un work item."""
     project: Annotated[str, Field(description="Nombre del proyecto de Azure DevOps")]
     work_item_id: Annotated[int, Field(description="ID del work item")]
     tags: Annotated[List[str], Field(description="Lista de etiquetas a establecer")]
 
 
-class GetMeQuery(BaseModel):
+class GetMeQuery(ToolArguments):
     """No necesita parámetros para obtener información del usuario autenticado"""
     pass
 
 
+class WorkItemsPromptArgs(ToolArguments):
+    """Argumentos del prompt work_items."""
+    project: Annotated[str, Field(description="Nombre del proyecto")]
+    work_item_type: Annotated[Optional[str], Field(default=None, description="Tipo de work item")]
+    date_filter: Annotated[Optional[str], Field(default=None, description="Filtro de fecha")]
+    state: Annotated[Optional[str], Field(default=None, description="Estado del work item")]
+
+
+class PullRequestsPromptArgs(ToolArguments):
+    """Argumentos del prompt pull_requests."""
+    project: Annotated[str, Field(description="Nombre del proyecto")]
+    repository_id: Annotated[Optional[str], Field(default=None, description="ID del repositorio")]
+    status: Annotated[PullRequestStatus, Field(default="active", description="Estado del PR")]
+
+
+# Definición de las herramientas MCP: (nombre, descripción, modelo de entrada)
+_TOOL_SPECS: tuple[tuple[str, str, type[ToolArguments]], ...] = (
+    ("list_projects", "Lista los proyectos disponibles en una organización de Azure DevOps.", ProjectsQuery),
+    ("list_work_items", "Busca y lista work items en un proyecto de Azure DevOps con diversos filtros.", WorkItemsQuery),
+    ("get_work_item", "Obtiene todos los detalles de un work item específico por su ID.", WorkItemQuery),
+    ("create_work_item", "Crea un nuevo work item en un proyecto de Azure DevOps.", WorkItemCreateModel),
+    ("update_work_item", "Actualiza un work item existente en Azure DevOps.", WorkItemUpdateModel),
+    ("add_work_item_comment", "Añade un comentario a un work item existente.", WorkItemCommentModel),
+    ("link_work_items", "Vincula dos work items con una relación específica.", WorkItemLinkModel),
+    ("clone_work_item", "Crea una copia de un work item existente con un nuevo título.", WorkItemCloneModel),
+    ("get_work_item_history", "Obtiene el historial de cambios de un work item.", WorkItemHistoryQuery),
+    ("update_work_item_tags", "Actualiza las etiquetas de un work item.", WorkItemTagsModel),
+    ("list_repositories", "Lista los repositorios disponibles en un proyecto de Azure DevOps.", RepositoriesQuery),
+    ("get_repository", "Obtiene todos los detalles de un repositorio específico.", RepositoryQuery),
+    ("get_file_content", "Obtiene el contenido de un archivo o directorio de un repositorio.", FileContentQuery),
+    ("list_pipelines", "Lista los pipelines disponibles en un proyecto de Azure DevOps.", PipelinesQuery),
+    ("list_pull_requests", "Lista los pull requests en un proyecto o repositorio específico.", PullRequestsQuery),
+    ("create_pull_request", "Crea un nuevo pull request entre dos ramas.", PullRequestCreateModel),
+    ("add_pull_request_comment", "Añade un comentario a un pull request existente.", PullRequestCommentCreate),
+    ("get_me", "Obtiene información del usuario autenticado en Azure DevOps.", GetMeQuery),
+)
+
+_NAME_TO_MODEL: Dict[str, type[ToolArguments]] = {name: model for name, _, model in _TOOL_SPECS}
+
+# Los esquemas de entrada son estáticos: se generan una sola vez al importar el módulo
+# en lugar de en cada petición list_tools.
+_SCHEMAS: Dict[type, Dict[str, Any]] = {
+    model: model.model_json_schema() for model in _NAME_TO_MODEL.values()
+}
+
+# Instancias precalculadas para las herramientas cuyos campos son todos opcionales
+# (get_me, list_projects): una llamada sin argumentos no necesita pasar por Pydantic.
+# Los modelos son inmutables, así que se pueden compartir entre llamadas
+_DEFAULT_ARGS: Dict[str, ToolArguments] = {
+    name: model()
+    for name, model in _NAME_TO_MODEL.items()
+    if not any(field.is_required() for field in model.model_fields.values())
+}
+
+_TOOLS_LIST: list[Tool] = [
+    Tool(name=name, description=description, inputSchema=_SCHEMAS[model])
+    for name, description, model in _TOOL_SPECS
+]
+
+
+# Modelo de argumentos de cada prompt, validado una sola vez al entrar en get_prompt
+_PROMPT_MODELS: Dict[str, type[ToolArguments]] = {
+    "work_items": WorkItemsPromptArgs,
+    "pull_requests": PullRequestsPromptArgs,
+}
+
+_PROMPTS_LIST: list[Prompt] = [
+    Prompt(
+        name="work_items",
+        description="Busca work items en Azure DevOps",
+        arguments=[
+            PromptArgument(
+                name="project", 
+                description="Nombre del proyecto", 
+                required=True
+            ),
+            PromptArgument(
+                name="work_item_type", 
+                description="Tipo de work item (Epic, User Story, Task, Bug, etc.)", 
+                required=False
+            ),
+            PromptArgument(
+                name="date_filter", 
+                description="Filtro de fecha en lenguaje natural", 
+                required=False
+            ),
+            PromptArgument(
+                name="state", 
+                description="Estado del work item", 
+                required=False
+            ),
+        ],
+    ),
+    Prompt(
+        name="pull_requests",
+        description="Lista los pull requests en un proyecto o repositorio",
+        arguments=[
+            PromptArgument(
+                name="project", 
+                description="Nombre del proyecto", 
+                required=True
+            ),
+            PromptArgument(
+                name="repository_id", 
+                description="ID del repositorio", 
+                required=False
+            ),
+            PromptArgument(
+                name="status", 
+                description="Estado del PR (active, abandoned, completed, all)", 
+                required=False
+            ),
+        ],
+    ),
+]
+
+
+# Tiempo de vida (segundos) de las respuestas cacheadas de las herramientas de solo lectura
+_CACHE_TTLS: Dict[str, float] = {
+    "list_projects": 300,
+    "list_repositories": 300,
+    "get_repository": 60,
+    "list_pipelines": 60,
+    "list_pull_requests": 30,
+    "list_work_items": 30,
+    "get_work_item": 60,
+    "get_work_item_history": 30,
+    "get_me": 3600,
+}
+
+# Entradas de la caché que deja obsoletas cada herramienta que modifica datos en Azure DevOps
+_WORK_ITEM_READS = ("list_work_items", "get_work_item", "get_work_item_history")
+_CACHE_INVALIDATIONS: Dict[str, tuple[str, ...]] = {
+    "create_work_item": _WORK_ITEM_READS,
+    "update_work_item": _WORK_ITEM_READS,
+    "add_work_item_comment": _WORK_ITEM_READS,
+    "link_work_items": _WORK_ITEM_READS,
+    "clone_work_item": _WORK_ITEM_READS,
+    "update_work_item_tags": _WORK_ITEM_READS,
+    "create_pull_request": ("list_pull_requests",),
+    "add_pull_request_comment": ("list_pull_requests",),
+}
+
+# Número máximo de respuestas cacheadas
+_CACHE_MAXSIZE = 512
+_RESPONSE_CACHE_MAXSIZE = 256
+
+# Número máximo de llamadas HTTP simultáneas a Azure DevOps
+_AZDO_MAX_WORKERS = 16
+
+_cache = TTLCache(maxsize=_CACHE_MAXSIZE)
+# Respuestas ya formateadas de las herramientas de solo lectura, por (herramienta, argumentos
+# validados). Cada respuesta caduca a la vez que el primero de los datos de _cache con los que
+# se construyó y comparte su invalidación, así que nunca es más antigua que los datos
+_response_cache = TTLCache(maxsize=_RESPONSE_CACHE_MAXSIZE)
+
+# Instantes de caducidad de las entradas de _cache leídas durante la llamada en curso
+# (cada petición MCP se atiende en su propia tarea, con su propia copia del contexto)
+_data_expiries: ContextVar[Optional[List[float]]] = ContextVar("_data_expiries", default=None)
+
+# Errores con mensaje constante: el ErrorData se construye una sola vez. Se lanza un
+# McpError nuevo en cada caso porque reutilizar la misma excepción acumularía tracebacks
+_ERR_PROMPT_ARGS_REQUIRED = ErrorData(code=INVALID_PARAMS, message="Se requieren argumentos para el prompt")
+
+
+def _paginate(items: List[Any], page: int, page_size: int) -> tuple[List[Any], int, str]:
+    """Devolver los elementos de la página pedida, el número del primero y el pie de página (vacío si solo hay una)."""
+    total = len(items)
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        raise _invalid_params(f"La página {page} no existe: hay {pages} página(s) de {page_size} elementos")
+    start = (page - 1) * page_size
+    page_items = items[start:start + page_size]
+    footer = ""
+    if pages > 1:
+        footer = f"Página {page} de {pages} (mostrando {len(page_items)} de {total})\n"
+    return page_items, start + 1, footer
+
+
+def _invalid_params(message: str) -> McpError:
+    """Crear el error MCP para argumentos inválidos con un mensaje dinámico."""
+    return McpError(ErrorData(code=INVALID_PARAMS, message=message))
+
+
+async def _cached_call(key: tuple, fn, *args) -> Any:
+    """Ejecutar una llamada de solo lectura a Azure DevOps reutilizando la respuesta cacheada si sigue vigente."""
+    entry = _cache.get_entry(key)
+    if entry is None:
+        if inspect.iscoroutinefunction(fn):
+            value = await fn(*args)
+        else:
+            value = await asyncio.to_thread(fn, *args)
+        expires_at = _cache.set(key, value, _CACHE_TTLS[key[0]])
+    else:
+        expires_at, value = entry
+    
+    expiries = _data_expiries.get()
+    if expiries is not None:
+        expiries.append(expires_at)
+    return value
+
+
+async def _handle_list_projects(azdo: "AzureDevOpsTool", args: ProjectsQuery) -> list[TextContent]:
+    """Lista los proyectos disponibles en una organización de Azure DevOps."""
+    projects = await _cached_call(("list_projects",), azdo.list_projects)
+    
+    if not projects:
+        return [TextContent(
+            type="text", 
+            text="No se encontraron proyectos en la organización."
+        )]
+    
+    # Formatea la salida para mostrar información relevante
+    parts = ["Proyectos en Azure DevOps:\n\n"]
+    parts.extend(
+        f"{idx}. {project.get('name')}\n"
+        f"   ID: {project.get('id')}\n"
+        f"   Descripción: {project.get('description') or 'N/A'}\n"
+        f"   Estado: {project.get('state')}\n"
+        f"   Último cambio: {project.get('lastUpdateTime')}\n"
+        f"   URL: {project.get('url')}\n\n"
+        for idx, project in enumerate(projects, 1)
+    )
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_get_me(azdo: "AzureDevOpsTool", args: GetMeQuery) -> list[TextContent]:
+    """Obtiene información del usuario autenticado en Azure DevOps."""
+    # Obtener información del usuario
+    user_info = await _cached_call(("get_me",), azdo.get_me)
+    
+    # Formatear la respuesta como texto
+    if user_info:
+        parts = [f"Información del usuario autenticado:\n\n"]
+        
+        # Añadir datos principales del usuario
+        parts.append(f"📋 Detalles del usuario:\n")
+        parts.append(f"- Nombre: {user_info.get('displayName', 'No disponible')}\n")
+        parts.append(f"- Email: {user_info.get('mailAddress', 'No disponible')}\n")
+        parts.append(f"- ID: {user_info.get('id', 'No disponible')}\n")
+        
+        # Añadir detalles adicionales si están disponibles
+        if 'descriptor' in user_info:
+            parts.append(f"- Descriptor: {user_info.get('descriptor')}\n")
+            
+        # Añadir roles y permisos si están disponibles
+        if 'directoryAlias' in user_info:
+            parts.append(f"- Alias: {user_info.get('directoryAlias')}\n")
+            
+        # URL de perfil
+        if 'url' in user_info:
+            parts.append(f"\nURL del perfil: {user_info.get('url')}\n")
+    else:
+        parts = ["No se pudo obtener información del usuario autenticado."]
+        
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_list_work_items(azdo: "AzureDevOpsTool", args: WorkItemsQuery) -> list[TextContent]:
+    """Busca y lista work items en un proyecto de Azure DevOps con diversos filtros."""
+    project = args.project
+    work_items = await _cached_call(
+        ("list_work_items", args.query_string, project, args.work_item_type, args.date_filter, args.state),
+        azdo.list_work_items, args.query_string, project, args.work_item_type, args.date_filter, args.state
+    )
+    
+    if not work_items:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontraron work items con los criterios especificados en el proyecto {project}."
+        )]
+    
+    # Formatea la salida para mostrar información relevante (solo la página pedida)
+    page_items, first, footer = _paginate(work_items, args.page, args.page_size)
+    parts = [f"Work Items en {project}:\n\n"]
+    parts.extend(format_work_item_summary(idx, wi) for idx, wi in enumerate(page_items, first))
+    
+    parts.append(footer)
+    return [TextContent(type="text", text="".join(parts))]
+
+
+# Cabecera de get_work_item con los campos básicos del work item
+_WORK_ITEM_HEADER = (
+    "Work Item #{id} - {title}\n\n"
+    "Proyecto: {project}\n"
+    "Tipo: {type}\n"
+    "Estado: {state}\n"
+    "Razón: {reason}\n"
+    "Asignado a: {assigned_to}\n"
+    "Creado por: {created_by}\n"
+    "Creado: {created}\n"
+    "Modificado: {changed}\n"
+)
+
+# Prefijos de los campos que get_work_item ya muestra (o descarta) en la cabecera
+_BASIC_FIELD_PREFIXES = ('System.', 'Microsoft.VSTS.Common.')
+
+
+async def _handle_get_work_item(azdo: "AzureDevOpsTool", args: WorkItemQuery) -> list[TextContent]:
+    """Obtiene todos los detalles de un work item específico por su ID."""
+    work_item = await _cached_call(
+        ("get_work_item", args.work_item_id, args.project),
+        azdo.get_work_item, args.work_item_id, args.project
+    )
+    
+    if not work_item:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontró el work item {args.work_item_id} en el proyecto {args.project}."
+        )]
+    
+    # Formatea la salida para mostrar toda la información del work item
+    fields = work_item.get('fields') or _EMPTY
+    get = fields.get
+    parts = [_WORK_ITEM_HEADER.format_map({
+        "id": work_item.get('id'),
+        "title": get('System.Title', 'Sin título'),
+        "project": args.project,
+        "type": get('System.WorkItemType', 'N/A'),
+        "state": get('System.State', 'N/A'),
+        "reason": get('System.Reason', 'N/A'),
+        "assigned_to": (get('System.AssignedTo') or _EMPTY).get('displayName', 'N/A'),
+        "created_by": (get('System.CreatedBy') or _EMPTY).get('displayName', 'N/A'),
+        "created": get('System.CreatedDate', 'N/A'),
+        "changed": get('System.ChangedDate', 'N/A'),
+    })]
+    append = parts.append
+    
+    # Descripción
+    description = get('System.Description')
+    if description:
+        append(f"\nDescripción:\n{description}\n\n")
+    
+    # Campos adicionales específicos del tipo de work item
+    for field_name, field_value in fields.items():
+        if field_name.startswith(_BASIC_FIELD_PREFIXES):
+            continue  # Ya mostramos los campos básicos
+            
+        if isinstance(field_value, dict) and 'displayName' in field_value:
+            field_value = field_value['displayName']
+            
+        append(f"{field_name}: {field_value}\n")
+    
+    # Enlaces a otros work items
+    if 'relations' in work_item:
+        append("\nRelaciones:\n")
+        for relation in work_item['relations']:
+            rel_type = relation.get('rel', 'N/A')
+            rel_url = relation.get('url', 'N/A')
+            _, sep, tail = rel_url.rpartition('/')
+            rel_id = tail if sep else 'N/A'
+            
+            append(f"- {rel_type}: {rel_id}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_create_work_item(azdo: "AzureDevOpsTool", args: WorkItemCreateModel) -> list[TextContent]:
+    """Crea un nuevo work item en un proyecto de Azure DevOps."""
+    work_item = await asyncio.to_thread(
+        azdo.create_work_item,
+        title=args.title,
+        work_item_type=args.work_item_type,
+        description=args.description,
+        assigned_to=args.assigned_to,
+        tags=args.tags,
+        project=args.project
+    )
+    
+    if not work_item:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudo crear el work item en el proyecto {args.project}."
+        )]
+    
+    # Formatear la salida para confirmar la creación
+    parts = [f"Work Item creado correctamente:\n\n"]
+    parts.append(f"ID: #{work_item.get('id')}\n")
+    parts.append(f"Título: {work_item.get('fields', {}).get('System.Title', 'N/A')}\n")
+    parts.append(f"Tipo: {work_item.get('fields', {}).get('System.WorkItemType', 'N/A')}\n")
+    parts.append(f"Estado: {work_item.get('fields', {}).get('System.State', 'N/A')}\n")
+    parts.append(f"URL: {work_item.get('_links', {}).get('html', {}).get('href', 'N/A')}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+# Correspondencia entre los argumentos de update_work_item y los campos de Azure DevOps
+_UPDATE_FIELD_PATHS = (
+    ("title", "/fields/System.Title"),
+    ("description", "/fields/System.Description"),
+    ("state", "/fields/System.State"),
+    ("assigned_to", "/fields/System.AssignedTo"),
+    ("tags", "/fields/System.Tags"),
+)
+
+
+async def _handle_update_work_item(azdo: "AzureDevOpsTool", args: WorkItemUpdateModel) -> list[TextContent]:
+    """Actualiza un work item existente en Azure DevOps."""
+    # Construir la lista de actualizaciones con los campos informados
+    updates = [
+        {"op": "add", "path": path, "value": value}
+        for attr, path in _UPDATE_FIELD_PATHS
+        if (value := getattr(args, attr))
+    ]
+    
+    if not updates:
+        return [TextContent(
+            type="text", 
+            text=f"No se proporcionaron campos para actualizar en el work item {args.work_item_id}."
+        )]
+    
+    # Realizar la actualización
+    work_item = await asyncio.to_thread(
+        azdo.update_work_item,
+        args.work_item_id,
+        updates,
+        args.project
+    )
+    
+    if not work_item:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudo actualizar el work item {args.work_item_id} en el proyecto {args.project}."
+        )]
+    
+    # Formatear la salida para confirmar la actualización
+    parts = [f"Work Item #{args.work_item_id} actualizado correctamente:\n\n"]
+    parts.append(f"Título: {work_item.get('fields', {}).get('System.Title', 'N/A')}\n")
+    parts.append(f"Estado: {work_item.get('fields', {}).get('System.State', 'N/A')}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_add_work_item_comment(azdo: "AzureDevOpsTool", args: WorkItemCommentModel) -> list[TextContent]:
+    """Añade un comentario a un work item existente."""
+    comment_result = await asyncio.to_thread(
+        azdo.add_work_item_comment,
+        args.work_item_id,
+        args.comment,
+        args.project
+    )
+    
+    if not comment_result:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudo añadir el comentario al work item {args.work_item_id}."
+        )]
+    
+    # Formatear la salida para confirmar que se añadió el comentario
+    result = f"Comentario añadido correctamente al Work Item #{args.work_item_id}.\n"
+    
+    return [TextContent(type="text", text=result)]
+
+
+async def _handle_link_work_items(azdo: "AzureDevOpsTool", args: WorkItemLinkModel) -> list[TextContent]:
+    """Vincula dos work items con una relación específica."""
+    link_result = await asyncio.to_thread(
+        azdo.link_work_items,
+        args.source_id,
+        args.target_id,
+        args.rel,
+        args.comment,
+        args.project
+    )
+    
+    if not link_result:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudo vincular el work item {args.source_id} con el {args.target_id}."
+        )]
+    
+    # Formatear la salida para confirmar que se vincularon los work items
+    parts = [f"Work Items vinculados correctamente:\n\n"]
+    parts.append(f"Work Item #{args.source_id} → {args.rel} → Work Item #{args.target_id}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_clone_work_item(azdo: "AzureDevOpsTool", args: WorkItemCloneModel) -> list[TextContent]:
+    """Crea una copia de un work item existente con un nuevo título."""
+    clone_result = await asyncio.to_thread(
+        azdo.clone_work_item,
+        args.work_item_id,
+        args.new_title,
+        args.project
+    )
+    
+    if not clone_result:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudo clonar el work item {args.work_item_id}."
+        )]
+    
+    # Formatear la salida para confirmar que se clonó el work item
+    parts = [f"Work Item clonado correctamente:\n\n"]
+    parts.append(f"Work Item Original: #{args.work_item_id}\n")
+    parts.append(f"Nuevo Work Item: #{clone_result.get('id')}\n")
+    parts.append(f"Nuevo Título: {clone_result.get('fields', {}).get('System.Title', 'N/A')}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_get_work_item_history(azdo: "AzureDevOpsTool", args: WorkItemHistoryQuery) -> list[TextContent]:
+    """Obtiene el historial de cambios de un work item."""
+    history = await _cached_call(
+        ("get_work_item_history", args.work_item_id, args.project),
+        azdo.get_work_item_history, args.work_item_id, args.project
+    )
+    
+    if not history:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontró historial para el work item {args.work_item_id}."
+        )]
+    
+    # Formatear la salida para mostrar el historial
+    page_items, first, footer = _paginate(history, args.page, args.page_size)
+    parts = [f"Historial del Work Item #{args.work_item_id}:\n\n"]
+    
+    parts.extend(format_history_entry(idx, update) for idx, update in enumerate(page_items, first))
+    
+    parts.append(footer)
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_update_work_item_tags(azdo: "AzureDevOpsTool", args: WorkItemTagsModel) -> list[TextContent]:
+    """Actualiza las etiquetas de un work item."""
+    tags_result = await asyncio.to_thread(
+        azdo.update_work_item_tags,
+        args.work_item_id,
+        args.tags,
+        args.project
+    )
+    
+    if not tags_result:
+        return [TextContent(
+            type="text", 
+            text=f"No se pudieron actualizar las etiquetas del work item {args.work_item_id}."
+        )]
+    
+    # Formatear la salida para confirmar que se actualizaron las etiquetas
+    parts = [f"Etiquetas actualizadas correctamente para el Work Item #{args.work_item_id}.\n\n"]
+    parts.append(f"Nuevas etiquetas: {'; '.join(args.tags)}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_list_repositories(azdo: "AzureDevOpsTool", args: RepositoriesQuery) -> list[TextContent]:
+    """Lista los repositorios disponibles en un proyecto de Azure DevOps."""
+    repositories = await _cached_call(
+        ("list_repositories", args.project, args.date_filter),
+        azdo.list_repositories, args.project, args.date_filter
+    )
+    
+    if not repositories:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontraron repositorios en el proyecto {args.project}."
+        )]
+    
+    # Formatea la salida para mostrar información relevante
+    page_items, first, footer = _paginate(repositories, args.page, args.page_size)
+    parts = [f"Repositorios en {args.project}:\n\n"]
+    parts.extend(format_repository_summary(idx, repo) for idx, repo in enumerate(page_items, first))
+    
+    parts.append(footer)
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _fetch_repository_details(azdo: "AzureDevOpsTool", repository_id: str, project: str) -> Dict[str, Any]:
+    """Obtener repositorio, referencias y estadísticas lanzando las tres peticiones en paralelo."""
+    repo_info, refs, stats = await asyncio.gather(
+        asyncio.to_thread(azdo.get_repository, repository_id, project),
+        asyncio.to_thread(azdo.get_repository_refs, repository_id, project),
+        asyncio.to_thread(azdo.get_repository_branch_stats, repository_id, project),
+    )
+    return {"repository": repo_info, "refs": refs, "stats": stats}
+
+
+async def _handle_get_repository(azdo: "AzureDevOpsTool", args: RepositoryQuery) -> list[TextContent]:
+    """Obtiene todos los detalles de un repositorio específico."""
+    repo_details = await _cached_call(
+        ("get_repository", args.repository_id, args.project),
+        _fetch_repository_details, azdo, args.repository_id, args.project
+    )
+    
+    if not repo_details or 'repository' not in repo_details:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontró el repositorio {args.repository_id} en el proyecto {args.project}."
+        )]
+    
+    repo = repo_details['repository']
+    refs = repo_details.get('refs', [])
+    stats = repo_details.get('stats', [])
+    
+    # Formatea la salida para mostrar toda la información del repositorio
+    parts = [f"Repositorio: {repo.get('name')}\n\n"]
+    parts.append(f"ID: {repo.get('id')}\n")
+    parts.append(f"Default branch: {repo.get('defaultBranch', 'N/A')}\n")
+    parts.append(f"Proyecto: {repo.get('project', {}).get('name', 'N/A')}\n")
+    parts.append(f"Size: {repo.get('size', 'N/A')}\n")
+    parts.append(f"URL: {repo.get('remoteUrl', 'N/A')}\n")
+    parts.append(f"WebURL: {repo.get('webUrl', 'N/A')}\n\n")
+    
+    # Referencias (ramas, tags)
+    if refs:
+        parts.append("Referencias (branches, tags):\n")
+        for ref in refs[:10]:  # Limitamos a 10 refs para no sobrecargar la respuesta
+            name = branch_name(ref.get('name', ''))
+            parts.append(f"- {name}\n")
+        
+        if len(refs) > 10:
+            parts.append(f"... y {len(refs) - 10} más\n")
+        
+        parts.append("\n")
+    
+    # Estadísticas por branch
+    if stats:
+        parts.append("Estadísticas por branch:\n")
+        for stat in stats[:5]:  # Limitamos a 5 branches para no sobrecargar
+            branch = branch_name(stat.get('name', ''))
+            commits = stat.get('count', 0)
+            parts.append(f"- {branch}: {commits} commits\n")
+        
+        if len(stats) > 5:
+            parts.append(f"... y {len(stats) - 5} más\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_get_file_content(azdo: "AzureDevOpsTool", args: FileContentQuery) -> list[TextContent]:
+    """Obtiene el contenido de un archivo o directorio de un repositorio."""
+    content = await asyncio.to_thread(
+        azdo.get_file_content,
+        args.repository_id,
+        args.path,
+        args.branch,
+        args.project
+    )
+    
+    if isinstance(content, dict) and 'value' in content:
+        # Es un directorio, formatear el listado de archivos
+        parts = [f"Contenido del directorio {args.path} (rama: {args.branch}):\n\n"]
+        
+        for item in content.get('value', []):
+            item_type = 'DIR' if item.get('isFolder', False) else 'FILE'
+            item_path = item.get('path', 'N/A')
+            parts.append(f"{item_type}: {item_path}\n")
+        
+        return [TextContent(type="text", text="".join(parts))]
+    else:
+        # Es un archivo, mostrar su contenido
+        parts = [f"Contenido del archivo {args.path} (rama: {args.branch}):\n\n"]
+        parts.append(content)
+        
+        return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_list_pipelines(azdo: "AzureDevOpsTool", args: PipelinesQuery) -> list[TextContent]:
+    """Lista los pipelines disponibles en un proyecto de Azure DevOps."""
+    pipelines = await _cached_call(
+        ("list_pipelines", args.project, args.date_filter),
+        azdo.list_pipelines, args.project, args.date_filter
+    )
+    
+    if not pipelines:
+        return [TextContent(
+            type="text", 
+            text=f"No se encontraron pipelines en el proyecto {args.project}."
+        )]
+    
+    # Formatea la salida para mostrar información relevante
+    page_items, first, footer = _paginate(pipelines, args.page, args.page_size)
+    parts = [f"Pipelines en {args.project}:\n\n"]
+    parts.extend(format_pipeline_summary(idx, pipeline) for idx, pipeline in enumerate(page_items, first))
+    
+    parts.append(footer)
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_list_pull_requests(azdo: "AzureDevOpsTool", args: PullRequestsQuery) -> list[TextContent]:
+    """Lista los pull requests en un proyecto o repositorio específico."""
+    pull_requests = await _cached_call(
+        ("list_pull_requests", args.repository_id, args.status, args.project),
+        azdo.list_pull_requests, args.repository_id, args.status, args.project
+    )
+    
+    if not pull_requests:
+        repository_msg = f" en el repositorio {args.repository_id}" if args.repository_id else ""
+        return [TextContent(
+            type="text", 
+            text=f"No se encontraron pull requests{repository_msg} en el proyecto {args.project} con estado {args.status}."
+        )]
+    
+    # Formatea la salida para mostrar información relevante
+    repository_msg = f" en el repositorio {args.repository_id}" if args.repository_id else ""
+    page_items, first, footer = _paginate(pull_requests, args.page, args.page_size)
+    parts = [f"Pull Requests {args.status}{repository_msg} en {args.project}:\n\n"]
+    
+    parts.extend(format_pull_request_summary(idx, pr) for idx, pr in enumerate(page_items, first))
+    
+    parts.append(footer)
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_create_pull_request(azdo: "AzureDevOpsTool", args: PullRequestCreateModel) -> list[TextContent]:
+    """Crea un nuevo pull request entre dos ramas."""
+    pull_request = await asyncio.to_thread(
+        azdo.create_pull_request,
+        args.source_branch,
+        args.target_branch,
+        args.title,
+        args.description,
+        args.repository_id,
+        args.project
+    )
+    
+    if not pull_request:
+        return [TextContent(
+            type="text", 
+            text=f"Error al crear el pull request en el repositorio {args.repository_id}."
+        )]
+    
+    # Formatea la salida para mostrar información del PR creado
+    parts = [f"Pull Request creado correctamente:\n\n"]
+    parts.append(f"ID: #{pull_request.get('pullRequestId')}\n")
+    parts.append(f"Título: {pull_request.get('title')}\n")
+    parts.append(f"Estado: {pull_request.get('status')}\n")
+    parts.append(f"Creado por: {pull_request.get('createdBy', _EMPTY).get('displayName', 'N/A')}\n")
+    parts.append(f"Source branch: {branch_name(pull_request.get('sourceRefName', ''))}\n")
+    parts.append(f"Target branch: {branch_name(pull_request.get('targetRefName', ''))}\n")
+    parts.append(f"URL: {pull_request.get('url', 'N/A')}\n")
+    parts.append(f"Web URL: {pull_request.get('_links', _EMPTY).get('web', _EMPTY).get('href', 'N/A')}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+async def _handle_add_pull_request_comment(azdo: "AzureDevOpsTool", args: PullRequestCommentCreate) -> list[TextContent]:
+    """Añade un comentario a un pull request existente."""
+    comment_result = await asyncio.to_thread(
+        azdo.add_pull_request_comment,
+        args.pull_request_id,
+        args.repository_id,
+        args.comment,
+        args.thread_id,
+        args.project
+    )
+    
+    if not comment_result:
+        return [TextContent(
+            type="text", 
+            text=f"Error al añadir el comentario al pull request {args.pull_request_id}."
+        )]
+    
+    # Formatea la salida para confirmar que se añadió el comentario
+    if 'id' in comment_result:
+        # Es una respuesta a un nuevo comentario
+        parts = [f"Comentario añadido correctamente al PR #{args.pull_request_id}:\n\n"]
+        parts.append(f"ID del comentario: {comment_result.get('id')}\n")
+        parts.append(f"Contenido: {comment_result.get('content', 'N/A')}\n")
+    else:
+        # Es una respuesta a un nuevo hilo
+        parts = [f"Nuevo hilo de comentarios añadido al PR #{args.pull_request_id}:\n\n"]
+        parts.append(f"ID del hilo: {comment_result.get('id')}\n")
+        comments = comment_result.get('comments', [])
+        if comments:
+            parts.append(f"Comentario inicial: {comments[0].get('content', 'N/A')}\n")
+    
+    return [TextContent(type="text", text="".join(parts))]
+
+
+# Tabla de despacho: nombre de herramienta -> manejador
+_HANDLERS = {
+    "list_projects": _handle_list_projects,
+    "get_me": _handle_get_me,
+    "list_work_items": _handle_list_work_items,
+    "get_work_item": _handle_get_work_item,
+    "create_work_item": _handle_create_work_item,
+    "update_work_item": _handle_update_work_item,
+    "add_work_item_comment": _handle_add_work_item_comment,
+    "link_work_items": _handle_link_work_items,
+    "clone_work_item": _handle_clone_work_item,
+    "get_work_item_history": _handle_get_work_item_history,
+    "update_work_item_tags": _handle_update_work_item_tags,
+    "list_repositories": _handle_list_repositories,
+    "get_repository": _handle_get_repository,
+    "get_file_content": _handle_get_file_content,
+    "list_pipelines": _handle_list_pipelines,
+    "list_pull_requests": _handle_list_pull_requests,
+    "create_pull_request": _handle_create_pull_request,
+    "add_pull_request_comment": _handle_add_pull_request_comment,
+}
+
+# Toda herramienta publicada debe tener su manejador (y viceversa)
+assert _HANDLERS.keys() == _NAME_TO_MODEL.keys(), "_TOOL_SPECS y _HANDLERS no coinciden"
+
+# Tabla de despacho de call_tool: una sola búsqueda devuelve el modelo de entrada
+# (validado con su validador compilado) y el manejador de la herramienta
+_DISPATCH: Dict[str, tuple[type[ToolArguments], Callable[..., Awaitable[list[TextContent]]]]] = {
+    name: (_NAME_TO_MODEL[name], handler) for name, handler in _HANDLERS.items()
+}
+
+
 async def serve() -> None:
     """Ejecutar el servidor MCP para Azure DevOps."""
-    print("Iniciando el servidor MCP para Azure DevOps...")
+    logger.info("Iniciando el servidor MCP para Azure DevOps...")
     server = Server("mcp-azuredevops")
     
     try:
         # Inicializar Azure DevOps client
-        print("Inicializando cliente de Azure DevOps...")
+        logger.info("Inicializando cliente de Azure DevOps...")
+        from devops_tools import AzureDevOpsTool
+        from requests import RequestException
         azdo = AzureDevOpsTool()
-        print("Cliente de Azure DevOps inicializado correctamente.")
+        logger.info("Cliente de Azure DevOps inicializado correctamente.")
     except ValueError as e:
-        print(f"Error al inicializar Azure DevOps client: {str(e)}")
-        print("Asegúrate de tener configuradas las variables de entorno necesarias:")
-        print("  - AZDO_PAT: Personal Access Token")
-        print("  - AZDO_ORG: URL de la organización (https://dev.azure.com/miorganizacion)")
+        logger.error("Error al inicializar Azure DevOps client: %s", e)
+        logger.error("Asegúrate de tener configuradas las variables de entorno necesarias:")
+        logger.error("  - AZDO_PAT: Personal Access Token")
+        logger.error("  - AZDO_ORG: URL de la organización (https://dev.azure.com/miorganizacion)")
         return
     
+    # Las llamadas al cliente (bloqueantes) se ejecutan con asyncio.to_thread; se usa un
+    # pool acotado y compartido para que varias herramientas avancen en paralelo sin
+    # depender del número de CPUs
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=_AZDO_MAX_WORKERS, thread_name_prefix="azdo")
+    )
+    
     @server.list_tools()
     async def list_tools() -> list[Tool]:
-        return [
-            Tool(
-                name="list_projects",
-                description="Lista los proyectos disponibles en una organización de Azure DevOps.",
-                inputSchema=ProjectsQuery.model_json_schema(),
-            ),
-            Tool(
-                name="list_work_items",
-                description="Busca y lista work items en un proyecto de Azure DevOps con diversos filtros.",
-                inputSchema=WorkItemsQuery.model_json_schema(),
-            ),
-            Tool(
-                name="get_work_item",
-                description="Obtiene todos los detalles de un work item específico por su ID.",
-                inputSchema=WorkItemQuery.model_json_schema(),
-            ),
-            Tool(
-                name="create_work_item",
-                description="Crea un nuevo work item en un proyecto de Azure DevOps.",
-                inputSchema=WorkItemCreateModel.model_json_schema(),
-            ),
-            Tool(
-                name="update_work_item",
-                description="Actualiza un work item existente en Azure DevOps.",
-                inputSchema=WorkItemUpdateModel.model_json_schema(),
-            ),
-            Tool(
-                name="add_work_item_comment",
-                description="Añade un comentario a un work item existente.",
-                inputSchema=WorkItemCommentModel.model_json_schema(),
-            ),
-            Tool(
-                name="link_work_items",
-                description="Vincula dos work items con una relación específica.",
-                inputSchema=WorkItemLinkModel.model_json_schema(),
-            ),
-            Tool(
-                name="clone_work_item",
-                description="Crea una copia de un work item existente con un nuevo título.",
-                inputSchema=WorkItemCloneModel.model_json_schema(),
-            ),
-            Tool(
-                name="get_work_item_history",
-                description="Obtiene el historial de cambios de un work item.",
-                inputSchema=WorkItemHistoryQuery.model_json_schema(),
-            ),
-            Tool(
-                name="update_work_item_tags",
-                description="Actualiza las etiquetas de un work item.",
-                inputSchema=WorkItemTagsModel.model_json_schema(),
-            ),
-            Tool(
-                name="list_repositories",
-                description="Lista los repositorios disponibles en un proyecto de Azure DevOps.",
-                inputSchema=RepositoriesQuery.model_json_schema(),
-            ),
-            Tool(
-                name="get_repository",
-                description="Obtiene todos los detalles de un repositorio específico.",
-                inputSchema=RepositoryQuery.model_json_schema(),
-            ),
-            Tool(
-                name="get_file_content",
-                description="Obtiene el contenido de un archivo o directorio de un repositorio.",
-                inputSchema=FileContentQuery.model_json_schema(),
-            ),
-            Tool(
-                name="list_pipelines",
-                description="Lista los pipelines disponibles en un proyecto de Azure DevOps.",
-                inputSchema=PipelinesQuery.model_json_schema(),
-            ),
-            Tool(
-                name="list_pull_requests",
-                description="Lista los pull requests en un proyecto o repositorio específico.",
-                inputSchema=PullRequestsQuery.model_json_schema(),
-            ),
-            Tool(
-                name="create_pull_request",
-                description="Crea un nuevo pull request entre dos ramas.",
-                inputSchema=PullRequestCreateModel.model_json_schema(),
-            ),
-            Tool(
-                name="add_pull_request_comment",
-                description="Añade un comentario a un pull request existente.",
-                inputSchema=PullRequestCommentCreate.model_json_schema(),
-            ),
-            Tool(
-                name="get_me",
-                description="Obtiene información del usuario autenticado en Azure DevOps.",
-                inputSchema=GetMeQuery.model_json_schema(),
-            ),
-        ]
+        return _TOOLS_LIST
     
     @server.list_prompts()
     async def list_prompts() -> list[Prompt]:
-        return [
-            Prompt(
-                name="work_items",
-                description="Busca work items en Azure DevOps",
-                arguments=[
-                    PromptArgument(
-                        name="project", 
-                        description="Nombre del proyecto", 
-                        required=True
-                    ),
-                    PromptArgument(
-                        name="work_item_type", 
-                        description="Tipo de work item (Epic, User Story, Task, Bug, etc.)", 
-                        required=False
-                    ),
-                    PromptArgument(
-                        name="date_filter", 
-                        description="Filtro de fecha en lenguaje natural", 
-                        required=False
-                    ),
-                    PromptArgument(
-                        name="state", 
-                        description="Estado del work item", 
-                        required=False
-                    ),
-                ],
-            ),
-            Prompt(
-                name="pull_requests",
-                description="Lista los pull requests en un proyecto o repositorio",
-                arguments=[
-                    PromptArgument(
-                        name="project", 
-                        description="Nombre del proyecto", 
-                        required=True
-                    ),
-                    PromptArgument(
-                        name="repository_id", 
-                        description="ID del repositorio", 
-                        required=False
-                    ),
-                    PromptArgument(
-                        name="status", 
-                        description="Estado del PR (active, abandoned, completed, all)", 
-                        required=False
-                    ),
-                ],
-            ),
-        ]
+        return _PROMPTS_LIST
     
     @server.call_tool()
     async def call_tool(name, arguments: dict) -> list[TextContent]:
+        entry = _DISPATCH.get(name)
+        if entry is None:
+            raise _invalid_params(f"Herramienta no reconocida: {name}")
+        
+        model, handler = entry
+        args = _DEFAULT_ARGS.get(name) if not arguments else None
+        if args is None:
+            try:
+                args = model.model_validate(arguments)
+            except ValueError as e:
+                raise _invalid_params(str(e))
+        
+        # Los modelos de argumentos son inmutables y hashables: sirven directamente como clave
+        ttl = _CACHE_TTLS.get(name)
+        if ttl is not None:
+            response_key = (name, args)
+            cached = _response_cache.get(response_key)
+            if cached is not None:
+                return cached
+        
+        # Solo los errores del cliente de Azure DevOps se traducen a INTERNAL_ERROR;
+        # los McpError anteriores se propagan tal cual
+        started = time.perf_counter()
+        expiries: List[float] = []
+        token = _data_expiries.set(expiries)
         try:
-            if name == "list_projects":
-                try:
-                    args = ProjectsQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                projects = azdo.list_projects()
-                
-                if not projects:
-                    return [TextContent(
-                        type="text", 
-                        text="No se encontraron proyectos en la organización."
-                    )]
-                
-                # Formatea la salida para mostrar información relevante
-                result = "Proyectos en Azure DevOps:\n\n"
-                for idx, project in enumerate(projects, 1):
-                    result += f"{idx}. {project.get('name')}\n"
-                    result += f"   ID: {project.get('id')}\n"
-                    result += f"   Descripción: {project.get('description') or 'N/A'}\n"
-                    result += f"   Estado: {project.get('state')}\n"
-                    result += f"   Último cambio: {project.get('lastUpdateTime')}\n"
-                    result += f"   URL: {project.get('url')}\n\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "get_me":
-                try:
-                    args = GetMeQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                # Obtener información del usuario
-                user_info = azdo.get_me()
-                
-                # Formatear la respuesta como texto
-                if user_info:
-                    result = f"Información del usuario autenticado:\n\n"
-                    
-                    # Añadir datos principales del usuario
-                    result += f"📋 Detalles del usuario:\n"
-                    result += f"- Nombre: {user_info.get('displayName', 'No disponible')}\n"
-                    result += f"- Email: {user_info.get('mailAddress', 'No disponible')}\n"
-                    result += f"- ID: {user_info.get('id', 'No disponible')}\n"
-                    
-                    # Añadir detalles adicionales si están disponibles
-                    if 'descriptor' in user_info:
-                        result += f"- Descriptor: {user_info.get('descriptor')}\n"
-                        
-                    # Añadir roles y permisos si están disponibles
-                    if 'directoryAlias' in user_info:
-                        result += f"- Alias: {user_info.get('directoryAlias')}\n"
-                        
-                    # URL de perfil
-                    if 'url' in user_info:
-                        result += f"\nURL del perfil: {user_info.get('url')}\n"
-                else:
-                    result = "No se pudo obtener información del usuario autenticado."
-                    
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "list_work_items":
-                try:
-                    args = WorkItemsQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                project = args.project
-                work_items = azdo.list_work_items(
-                    query_string=args.query_string,
-                    project=project,
-                    work_item_type=args.work_item_type,
-                    date_filter=args.date_filter,
-                    state=args.state
-                )
-                
-                if not work_items:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontraron work items con los criterios especificados en el proyecto {project}."
-                    )]
-                
-                # Formatea la salida para mostrar información relevante
-                result = f"Work Items en {project}:\n\n"
-                for idx, wi in enumerate(work_items, 1):
-                    fields = wi.get('fields', {})
-                    result += f"{idx}. #{wi.get('id')} - {fields.get('System.Title', 'Sin título')}\n"
-                    result += f"   Tipo: {fields.get('System.WorkItemType', 'N/A')}\n"
-                    result += f"   Estado: {fields.get('System.State', 'N/A')}\n"
-                    result += f"   Asignado a: {fields.get('System.AssignedTo', {}).get('displayName', 'N/A')}\n"
-                    result += f"   Creado: {fields.get('System.CreatedDate', 'N/A')}\n"
-                    if 'System.Description' in fields and fields['System.Description']:
-                        result += f"   Descripción: {fields['System.Description'][:150]}...\n"
-                    result += "\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "get_work_item":
-                try:
-                    args = WorkItemQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                work_item = azdo.get_work_item(args.work_item_id, args.project)
-                
-                if not work_item:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontró el work item {args.work_item_id} en el proyecto {args.project}."
-                    )]
-                
-                # Formatea la salida para mostrar toda la información del work item
-                fields = work_item.get('fields', {})
-                result = f"Work Item #{work_item.get('id')} - {fields.get('System.Title', 'Sin título')}\n\n"
-                result += f"Proyecto: {args.project}\n"
-                result += f"Tipo: {fields.get('System.WorkItemType', 'N/A')}\n"
-                result += f"Estado: {fields.get('System.State', 'N/A')}\n"
-                result += f"Razón: {fields.get('System.Reason', 'N/A')}\n"
-                result += f"Asignado a: {fields.get('System.AssignedTo', {}).get('displayName', 'N/A')}\n"
-                result += f"Creado por: {fields.get('System.CreatedBy', {}).get('displayName', 'N/A')}\n"
-                result += f"Creado: {fields.get('System.CreatedDate', 'N/A')}\n"
-                result += f"Modificado: {fields.get('System.ChangedDate', 'N/A')}\n"
-                
-                # Descripción
-                if 'System.Description' in fields and fields['System.Description']:
-                    result += f"\nDescripción:\n{fields['System.Description']}\n\n"
-                
-                # Campos adicionales específicos del tipo de work item
-                for field_name, field_value in fields.items():
-                    if field_name.startswith('System.') or field_name.startswith('Microsoft.VSTS.Common.'):
-                        continue  # Ya mostramos los campos básicos
-                        
-                    if isinstance(field_value, dict) and 'displayName' in field_value:
-                        field_value = field_value['displayName']
-                        
-                    result += f"{field_name}: {field_value}\n"
-                
-                # Enlaces a otros work items
-                if 'relations' in work_item:
-                    result += "\nRelaciones:\n"
-                    for relation in work_item['relations']:
-                        rel_type = relation.get('rel', 'N/A')
-                        rel_url = relation.get('url', 'N/A')
-                        rel_id = rel_url.split('/')[-1] if '/' in rel_url else 'N/A'
-                        
-                        result += f"- {rel_type}: {rel_id}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "create_work_item":
-                try:
-                    args = WorkItemCreateModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                work_item = azdo.create_work_item(
-                    title=args.title,
-                    work_item_type=args.work_item_type,
-                    description=args.description,
-                    assigned_to=args.assigned_to,
-                    tags=args.tags,
-                    project=args.project
-                )
-                
-                if not work_item:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudo crear el work item en el proyecto {args.project}."
-                    )]
-                
-                # Formatear la salida para confirmar la creación
-                result = f"Work Item creado correctamente:\n\n"
-                result += f"ID: #{work_item.get('id')}\n"
-                result += f"Título: {work_item.get('fields', {}).get('System.Title', 'N/A')}\n"
-                result += f"Tipo: {work_item.get('fields', {}).get('System.WorkItemType', 'N/A')}\n"
-                result += f"Estado: {work_item.get('fields', {}).get('System.State', 'N/A')}\n"
-                result += f"URL: {work_item.get('_links', {}).get('html', {}).get('href', 'N/A')}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "update_work_item":
-                try:
-                    args = WorkItemUpdateModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                # Construir la lista de actualizaciones
-                updates = []
-                
-                if args.title:
-                    updates.append({"op": "add", "path": "/fields/System.Title", "value": args.title})
-                
-                if args.description:
-                    updates.append({"op": "add", "path": "/fields/System.Description", "value": args.description})
-                
-                if args.state:
-                    updates.append({"op": "add", "path": "/fields/System.State", "value": args.state})
-                
-                if args.assigned_to:
-                    updates.append({"op": "add", "path": "/fields/System.AssignedTo", "value": args.assigned_to})
-                
-                if args.tags:
-                    updates.append({"op": "add", "path": "/fields/System.Tags", "value": args.tags})
-                
-                if not updates:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se proporcionaron campos para actualizar en el work item {args.work_item_id}."
-                    )]
-                
-                # Realizar la actualización
-                work_item = azdo.update_work_item(
-                    args.work_item_id,
-                    updates,
-                    args.project
-                )
-                
-                if not work_item:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudo actualizar el work item {args.work_item_id} en el proyecto {args.project}."
-                    )]
-                
-                # Formatear la salida para confirmar la actualización
-                result = f"Work Item #{args.work_item_id} actualizado correctamente:\n\n"
-                result += f"Título: {work_item.get('fields', {}).get('System.Title', 'N/A')}\n"
-                result += f"Estado: {work_item.get('fields', {}).get('System.State', 'N/A')}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "add_work_item_comment":
-                try:
-                    args = WorkItemCommentModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                comment_result = azdo.add_work_item_comment(
-                    args.work_item_id,
-                    args.comment,
-                    args.project
-                )
-                
-                if not comment_result:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudo añadir el comentario al work item {args.work_item_id}."
-                    )]
-                
-                # Formatear la salida para confirmar que se añadió el comentario
-                result = f"Comentario añadido correctamente al Work Item #{args.work_item_id}.\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "link_work_items":
-                try:
-                    args = WorkItemLinkModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                link_result = azdo.link_work_items(
-                    args.source_id,
-                    args.target_id,
-                    args.rel,
-                    args.comment,
-                    args.project
-                )
-                
-                if not link_result:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudo vincular el work item {args.source_id} con el {args.target_id}."
-                    )]
-                
-                # Formatear la salida para confirmar que se vincularon los work items
-                result = f"Work Items vinculados correctamente:\n\n"
-                result += f"Work Item #{args.source_id} → {args.rel} → Work Item #{args.target_id}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "clone_work_item":
-                try:
-                    args = WorkItemCloneModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                clone_result = azdo.clone_work_item(
-                    args.work_item_id,
-                    args.new_title,
-                    args.project
-                )
-                
-                if not clone_result:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudo clonar el work item {args.work_item_id}."
-                    )]
-                
-                # Formatear la salida para confirmar que se clonó el work item
-                result = f"Work Item clonado correctamente:\n\n"
-                result += f"Work Item Original: #{args.work_item_id}\n"
-                result += f"Nuevo Work Item: #{clone_result.get('id')}\n"
-                result += f"Nuevo Título: {clone_result.get('fields', {}).get('System.Title', 'N/A')}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "get_work_item_history":
-                try:
-                    args = WorkItemHistoryQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                history = azdo.get_work_item_history(args.work_item_id, args.project)
-                
-                if not history:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontró historial para el work item {args.work_item_id}."
-                    )]
-                
-                # Formatear la salida para mostrar el historial
-                result = f"Historial del Work Item #{args.work_item_id}:\n\n"
-                
-                for idx, update in enumerate(history, 1):
-                    revised_by = update.get('revisedBy', {}).get('displayName', 'N/A')
-                    revised_date = update.get('revisedDate', 'N/A')
-                    
-                    result += f"{idx}. Modificado por: {revised_by} el {revised_date}\n"
-                    
-                    # Mostrar campos cambiados
-                    if 'fields' in update:
-                        result += "   Cambios:\n"
-                        for field_name, field_value in update['fields'].items():
-                            old_value = field_value.get('oldValue', 'N/A')
-                            new_value = field_value.get('newValue', 'N/A')
-                            result += f"   - {field_name}: {old_value} → {new_value}\n"
-                    
-                    result += "\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "update_work_item_tags":
-                try:
-                    args = WorkItemTagsModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                tags_result = azdo.update_work_item_tags(
-                    args.work_item_id,
-                    args.tags,
-                    args.project
-                )
-                
-                if not tags_result:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se pudieron actualizar las etiquetas del work item {args.work_item_id}."
-                    )]
-                
-                # Formatear la salida para confirmar que se actualizaron las etiquetas
-                result = f"Etiquetas actualizadas correctamente para el Work Item #{args.work_item_id}.\n\n"
-                result += f"Nuevas etiquetas: {'; '.join(args.tags)}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "list_repositories":
-                try:
-                    args = RepositoriesQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                repositories = azdo.list_repositories(args.project, args.date_filter)
-                
-                if not repositories:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontraron repositorios en el proyecto {args.project}."
-                    )]
-                
-                # Formatea la salida para mostrar información relevante
-                result = f"Repositorios en {args.project}:\n\n"
-                for idx, repo in enumerate(repositories, 1):
-                    result += f"{idx}. {repo.get('name')}\n"
-                    result += f"   ID: {repo.get('id')}\n"
-                    result += f"   Default branch: {repo.get('defaultBranch', 'N/A')}\n"
-                    result += f"   Proyecto: {repo.get('project', {}).get('name', 'N/A')}\n"
-                    result += f"   Size: {repo.get('size', 'N/A')}\n"
-                    result += f"   URL: {repo.get('remoteUrl', 'N/A')}\n\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "get_repository":
-                try:
-                    args = RepositoryQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                repo_details = azdo.get_repository_details(args.repository_id, args.project)
-                
-                if not repo_details or 'repository' not in repo_details:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontró el repositorio {args.repository_id} en el proyecto {args.project}."
-                    )]
-                
-                repo = repo_details['repository']
-                refs = repo_details.get('refs', [])
-                stats = repo_details.get('stats', [])
-                
-                # Formatea la salida para mostrar toda la información del repositorio
-                result = f"Repositorio: {repo.get('name')}\n\n"
-                result += f"ID: {repo.get('id')}\n"
-                result += f"Default branch: {repo.get('defaultBranch', 'N/A')}\n"
-                result += f"Proyecto: {repo.get('project', {}).get('name', 'N/A')}\n"
-                result += f"Size: {repo.get('size', 'N/A')}\n"
-                result += f"URL: {repo.get('remoteUrl', 'N/A')}\n"
-                result += f"WebURL: {repo.get('webUrl', 'N/A')}\n\n"
-                
-                # Referencias (ramas, tags)
-                if refs:
-                    result += "Referencias (branches, tags):\n"
-                    for ref in refs[:10]:  # Limitamos a 10 refs para no sobrecargar la respuesta
-                        name = ref.get('name', '').replace('refs/heads/', '')
-                        result += f"- {name}\n"
-                    
-                    if len(refs) > 10:
-                        result += f"... y {len(refs) - 10} más\n"
-                    
-                    result += "\n"
-                
-                # Estadísticas por branch
-                if stats:
-                    result += "Estadísticas por branch:\n"
-                    for stat in stats[:5]:  # Limitamos a 5 branches para no sobrecargar
-                        branch = stat.get('name', '').replace('refs/heads/', '')
-                        commits = stat.get('count', 0)
-                        result += f"- {branch}: {commits} commits\n"
-                    
-                    if len(stats) > 5:
-                        result += f"... y {len(stats) - 5} más\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "get_file_content":
-                try:
-                    args = FileContentQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                content = azdo.get_file_content(
-                    args.repository_id,
-                    args.path,
-                    args.branch,
-                    args.project
-                )
-                
-                if isinstance(content, dict) and 'value' in content:
-                    # Es un directorio, formatear el listado de archivos
-                    result = f"Contenido del directorio {args.path} (rama: {args.branch}):\n\n"
-                    
-                    for item in content.get('value', []):
-                        item_type = 'DIR' if item.get('isFolder', False) else 'FILE'
-                        item_path = item.get('path', 'N/A')
-                        result += f"{item_type}: {item_path}\n"
-                    
-                    return [TextContent(type="text", text=result)]
-                else:
-                    # Es un archivo, mostrar su contenido
-                    result = f"Contenido del archivo {args.path} (rama: {args.branch}):\n\n"
-                    result += content
-                    
-                    return [TextContent(type="text", text=result)]
-            
-            elif name == "list_pipelines":
-                try:
-                    args = PipelinesQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                pipelines = azdo.list_pipelines(args.project, args.date_filter)
-                
-                if not pipelines:
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontraron pipelines en el proyecto {args.project}."
-                    )]
-                
-                # Formatea la salida para mostrar información relevante
-                result = f"Pipelines en {args.project}:\n\n"
-                for idx, pipeline in enumerate(pipelines, 1):
-                    result += f"{idx}. {pipeline.get('name')}\n"
-                    result += f"   ID: {pipeline.get('id')}\n"
-                    result += f"   Tipo: {pipeline.get('folder', 'N/A')}\n"
-                    
-                    # Si hay información del último run, mostrarla
-                    if 'latestRun' in pipeline:
-                        latest_run = pipeline['latestRun']
-                        result += f"   Último run: #{latest_run.get('id', 'N/A')}\n"
-                        result += f"   Estado: {latest_run.get('state', 'N/A')}\n"
-                        result += f"   Resultado: {latest_run.get('result', 'N/A')}\n"
-                        result += f"   Fecha: {latest_run.get('createdDate', 'N/A')}\n"
-                    
-                    result += "\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "list_pull_requests":
-                try:
-                    args = PullRequestsQuery(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                pull_requests = azdo.list_pull_requests(
-                    args.repository_id,
-                    args.status,
-                    args.project
-                )
-                
-                if not pull_requests:
-                    repository_msg = f" en el repositorio {args.repository_id}" if args.repository_id else ""
-                    return [TextContent(
-                        type="text", 
-                        text=f"No se encontraron pull requests{repository_msg} en el proyecto {args.project} con estado {args.status}."
-                    )]
-                
-                # Formatea la salida para mostrar información relevante
-                repository_msg = f" en el repositorio {args.repository_id}" if args.repository_id else ""
-                result = f"Pull Requests {args.status}{repository_msg} en {args.project}:\n\n"
-                
-                for idx, pr in enumerate(pull_requests, 1):
-                    result += f"{idx}. #{pr.get('pullRequestId')} - {pr.get('title')}\n"
-                    result += f"   Estado: {pr.get('status')}\n"
-                    result += f"   Creado por: {pr.get('createdBy', {}).get('displayName', 'N/A')}\n"
-                    result += f"   Creado el: {pr.get('creationDate', 'N/A')}\n"
-                    result += f"   Source branch: {pr.get('sourceRefName', '').replace('refs/heads/', '')}\n"
-                    result += f"   Target branch: {pr.get('targetRefName', '').replace('refs/heads/', '')}\n"
-                    result += f"   Repositorio: {pr.get('repository', {}).get('name', 'N/A')}\n"
-                    result += f"   Descripción: {pr.get('description', 'N/A')[:150]}...\n\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "create_pull_request":
-                try:
-                    args = PullRequestCreateModel(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                pull_request = azdo.create_pull_request(
-                    args.source_branch,
-                    args.target_branch,
-                    args.title,
-                    args.description,
-                    args.repository_id,
-                    args.project
-                )
-                
-                if not pull_request:
-                    return [TextContent(
-                        type="text", 
-                        text=f"Error al crear el pull request en el repositorio {args.repository_id}."
-                    )]
-                
-                # Formatea la salida para mostrar información del PR creado
-                result = f"Pull Request creado correctamente:\n\n"
-                result += f"ID: #{pull_request.get('pullRequestId')}\n"
-                result += f"Título: {pull_request.get('title')}\n"
-                result += f"Estado: {pull_request.get('status')}\n"
-                result += f"Creado por: {pull_request.get('createdBy', {}).get('displayName', 'N/A')}\n"
-                result += f"Source branch: {pull_request.get('sourceRefName', '').replace('refs/heads/', '')}\n"
-                result += f"Target branch: {pull_request.get('targetRefName', '').replace('refs/heads/', '')}\n"
-                result += f"URL: {pull_request.get('url', 'N/A')}\n"
-                result += f"Web URL: {pull_request.get('_links', {}).get('web', {}).get('href', 'N/A')}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            elif name == "add_pull_request_comment":
-                try:
-                    args = PullRequestCommentCreate(**arguments)
-                except ValueError as e:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
-                
-                comment_result = azdo.add_pull_request_comment(
-                    args.pull_request_id,
-                    args.repository_id,
-                    args.comment,
-                    args.thread_id,
-                    args.project
-                )
-                
-                if not comment_result:
-                    return [TextContent(
-                        type="text", 
-                        text=f"Error al añadir el comentario al pull request {args.pull_request_id}."
-                    )]
-                
-                # Formatea la salida para confirmar que se añadió el comentario
-                if 'id' in comment_result:
-                    # Es una respuesta a un nuevo comentario
-                    result = f"Comentario añadido correctamente al PR #{args.pull_request_id}:\n\n"
-                    result += f"ID del comentario: {comment_result.get('id')}\n"
-                    result += f"Contenido: {comment_result.get('content', 'N/A')}\n"
-                else:
-                    # Es una respuesta a un nuevo hilo
-                    result = f"Nuevo hilo de comentarios añadido al PR #{args.pull_request_id}:\n\n"
-                    result += f"ID del hilo: {comment_result.get('id')}\n"
-                    comments = comment_result.get('comments', [])
-                    if comments:
-                        result += f"Comentario inicial: {comments[0].get('content', 'N/A')}\n"
-                
-                return [TextContent(type="text", text=result)]
-            
-            else:
-                raise McpError(ErrorData(
-                    code=INVALID_PARAMS, 
-                    message=f"Herramienta no reconocida: {name}"
-                ))
-                
-        except Exception as e:
+            result = await handler(azdo, args)
+        except (RequestException, ValueError, KeyError) as e:
             raise McpError(ErrorData(
                 code=INTERNAL_ERROR, 
                 message=f"Error al ejecutar la herramienta {name}: {str(e)}"
             ))
+        finally:
+            _data_expiries.reset(token)
+        
+        logger.debug("tool=%s took=%.3fs", name, time.perf_counter() - started)
+        
+        if ttl is not None:
+            # La respuesta no puede sobrevivir a los datos con los que se ha construido
+            _response_cache.set_until(response_key, result, min(expiries, default=time.monotonic() + ttl))
+        
+        stale = _CACHE_INVALIDATIONS.get(name)
+        if stale:
+            _cache.invalidate(*stale)
+            _response_cache.invalidate(*stale)
+        
+        return result
     
     @server.get_prompt()
     async def get_prompt(name: str, arguments: dict | None) -> GetPromptResult:
         if not arguments:
-            raise McpError(ErrorData(code=INVALID_PARAMS, message="Se requieren argumentos para el prompt"))
+            raise McpError(_ERR_PROMPT_ARGS_REQUIRED)
         
         try:
+            model = _PROMPT_MODELS.get(name)
+            if model is None:
+                raise _invalid_params(f"Prompt no reconocido: {name}")
+            
+            try:
+                args = model.model_validate(arguments)
+            except ValueError as e:
+                raise _invalid_params(str(e))
+            
             if name == "work_items":
-                if "project" not in arguments:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message="El proyecto es requerido"))
-                
-                project = arguments["project"]
-                work_item_type = arguments.get("work_item_type")
-                date_filter = arguments.get("date_filter")
-                state = arguments.get("state")
+                project = args.project
+                work_item_type = args.work_item_type
+                date_filter = args.date_filter
+                state = args.state
                 
-                work_items = azdo.list_work_items(
-                    query_string=None,
-                    project=project,
-                    work_item_type=work_item_type,
-                    date_filter=date_filter,
-                    state=state
+                work_items = await _cached_call(
+                    ("list_work_items", None, project, work_item_type, date_filter, state),
+                    azdo.list_work_items, None, project, work_item_type, date_filter, state
                 )
                 
                 if not work_items:
@@ -993,40 +1163,27 @@ async def serve() -> None:
                 filters_str = " ".join(filters)
                 title = f"Work Items en {project}" + (f" ({filters_str})" if filters else "")
                 
-                result = f"{title}:\n\n"
-                for idx, wi in enumerate(work_items, 1):
-                    fields = wi.get('fields', {})
-                    result += f"{idx}. #{wi.get('id')} - {fields.get('System.Title', 'Sin título')}\n"
-                    result += f"   Tipo: {fields.get('System.WorkItemType', 'N/A')}\n"
-                    result += f"   Estado: {fields.get('System.State', 'N/A')}\n"
-                    result += f"   Asignado a: {fields.get('System.AssignedTo', {}).get('displayName', 'N/A')}\n"
-                    result += f"   Creado: {fields.get('System.CreatedDate', 'N/A')}\n"
-                    if 'System.Description' in fields and fields['System.Description']:
-                        result += f"   Descripción: {fields['System.Description'][:150]}...\n"
-                    result += "\n"
+                parts = [f"{title}:\n\n"]
+                parts.extend(format_work_item_summary(idx, wi) for idx, wi in enumerate(work_items, 1))
                 
                 return GetPromptResult(
                     description=title,
                     messages=[
                         PromptMessage(
                             role="user",
-                            content=TextContent(type="text", text=result),
+                            content=TextContent(type="text", text="".join(parts)),
                         )
                     ],
                 )
             
             elif name == "pull_requests":
-                if "project" not in arguments:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message="El proyecto es requerido"))
-                
-                project = arguments["project"]
-                repository_id = arguments.get("repository_id")
-                status = arguments.get("status", "active")
+                project = args.project
+                repository_id = args.repository_id
+                status = args.status
                 
-                pull_requests = azdo.list_pull_requests(
-                    repository_id,
-                    status,
-                    project
+                pull_requests = await _cached_call(
+                    ("list_pull_requests", repository_id, status, project),
+                    azdo.list_pull_requests, repository_id, status, project
                 )
                 
                 if not pull_requests:
@@ -1048,32 +1205,18 @@ async def serve() -> None:
                 repository_msg = f" en el repositorio {repository_id}" if repository_id else ""
                 title = f"Pull Requests {status}{repository_msg} en {project}"
                 
-                result = f"{title}:\n\n"
-                for idx, pr in enumerate(pull_requests, 1):
-                    result += f"{idx}. #{pr.get('pullRequestId')} - {pr.get('title')}\n"
-                    result += f"   Estado: {pr.get('status')}\n"
-                    result += f"   Creado por: {pr.get('createdBy', {}).get('displayName', 'N/A')}\n"
-                    result += f"   Creado el: {pr.get('creationDate', 'N/A')}\n"
-                    result += f"   Source branch: {pr.get('sourceRefName', '').replace('refs/heads/', '')}\n"
-                    result += f"   Target branch: {pr.get('targetRefName', '').replace('refs/heads/', '')}\n"
-                    result += f"   Repositorio: {pr.get('repository', {}).get('name', 'N/A')}\n"
-                    result += f"   Descripción: {pr.get('description', 'N/A')[:150]}...\n\n"
+                parts = [f"{title}:\n\n"]
+                parts.extend(format_pull_request_summary(idx, pr) for idx, pr in enumerate(pull_requests, 1))
                 
                 return GetPromptResult(
                     description=title,
                     messages=[
                         PromptMessage(
                             role="user",
-                            content=TextContent(type="text", text=result),
+                            content=TextContent(type="text", text="".join(parts)),
                         )
                     ],
                 )
-            
-            else:
-                raise McpError(ErrorData(
-                    code=INVALID_PARAMS, 
-                    message=f"Prompt no reconocido: {name}"
-                ))
                 
         except Exception as e:
             return GetPromptResult(
@@ -1086,16 +1229,22 @@ async def serve() -> None:
                 ],
             )
     
-    print("Configurando opciones del servidor...")
+    logger.info("Configurando opciones del servidor...")
     options = server.create_initialization_options()
-    print("Iniciando servidor MCP (stdio)...")
+    logger.info("Iniciando servidor MCP (stdio)...")
     async with stdio_server() as (read_stream, write_stream):
-        print("Servidor MCP listo y esperando conexiones...")
+        logger.info("Servidor MCP listo y esperando conexiones...")
         await server.run(read_stream, write_stream, options, raise_exceptions=True)
 
 
 if __name__ == "__main__":
     import asyncio
     
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    
     # Ejecutar el servidor cuando se llama directamente al script
     asyncio.run(serve())
\ No newline at end of file
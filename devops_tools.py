@@ -1,6 +1,9 @@
 import os
+import re
 from typing import List, Dict, Any, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 import base64
 import json
@@ -12,6 +15,15 @@ from typing import Tuple
 # Cargar variables de entorno
 load_dotenv()
 
+# Patrones de los filtros de fecha en lenguaje natural, compilados una sola vez
+_LAST_N_DAYS_RE = re.compile(r'last (\d+) days?')
+_LAST_N_WEEKS_RE = re.compile(r'last (\d+) weeks?')
+_LAST_N_MONTHS_RE = re.compile(r'last (\d+) months?')
+_DATE_RANGE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})\s+to\s+(\d{4}-\d{2}-\d{2})')
+_SPECIFIC_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')
+_SINCE_DATE_RE = re.compile(r'since\s+(\d{4}-\d{2}-\d{2})')
+_BEFORE_DATE_RE = re.compile(r'before\s+(\d{4}-\d{2}-\d{2})')
+
 class AzureDevOpsTool:
     """Clase para interactuar con Azure DevOps API utilizando PAT"""
     
@@ -30,6 +42,21 @@ class AzureDevOpsTool:
             'Authorization': f'Basic {self._get_auth_token()}',
             'Content-Type': 'application/json'
         }
+        
+        # Sesión HTTP compartida: reutiliza las conexiones (keep-alive/TLS) entre llamadas
+        # y reintenta los errores transitorios de Azure DevOps. raise_on_status=False
+        # devuelve la última respuesta para que cada método siga decidiendo con
+        # raise_for_status()/status_code como hasta ahora
+        retry = Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
     
     def _get_auth_token(self) -> str:
         """Crear token de autenticación Basic para Azure DevOps API"""
@@ -48,8 +75,6 @@ class AzureDevOpsTool:
         Returns:
             tuple: (from_date, to_date) in YYYY-MM-DD format
         """
-        from datetime import datetime, timedelta
-        
         today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         date_filter = date_filter.lower().strip()
         
@@ -83,24 +108,22 @@ class AzureDevOpsTool:
             return start_of_last_year.strftime('%Y-%m-%d'), end_of_last_year.strftime('%Y-%m-%d')
             
         # More complex patterns with regex
-        import re
-        
         # Handle "last X days"
-        last_n_days_match = re.match(r'last (\d+) days?', date_filter)
+        last_n_days_match = _LAST_N_DAYS_RE.match(date_filter)
         if last_n_days_match:
             days = int(last_n_days_match.group(1))
             from_date = today - timedelta(days=days)
             return from_date.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
             
         # Handle "last X weeks"
-        last_n_weeks_match = re.match(r'last (\d+) weeks?', date_filter)
+        last_n_weeks_match = _LAST_N_WEEKS_RE.match(date_filter)
         if last_n_weeks_match:
             weeks = int(last_n_weeks_match.group(1))
             from_date = today - timedelta(weeks=weeks)
             return from_date.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
             
         # Handle "last X months"
-        last_n_months_match = re.match(r'last (\d+) months?', date_filter)
+        last_n_months_match = _LAST_N_MONTHS_RE.match(date_filter)
         if last_n_months_match:
             months = int(last_n_months_match.group(1))
             # Calculate date by going back months
@@ -116,26 +139,26 @@ class AzureDevOpsTool:
             return from_date.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
             
         # Handle specific date ranges with format "YYYY-MM-DD to YYYY-MM-DD"
-        date_range_match = re.match(r'(\d{4}-\d{2}-\d{2})\s+to\s+(\d{4}-\d{2}-\d{2})', date_filter)
+        date_range_match = _DATE_RANGE_RE.match(date_filter)
         if date_range_match:
             from_date = date_range_match.group(1)
             to_date = date_range_match.group(2)
             return from_date, to_date
             
         # Handle specific dates with format "YYYY-MM-DD"
-        specific_date_match = re.match(r'(\d{4}-\d{2}-\d{2})', date_filter)
+        specific_date_match = _SPECIFIC_DATE_RE.match(date_filter)
         if specific_date_match:
             specific_date = specific_date_match.group(1)
             return specific_date, specific_date
             
         # Handle "since YYYY-MM-DD"
-        since_date_match = re.match(r'since\s+(\d{4}-\d{2}-\d{2})', date_filter)
+        since_date_match = _SINCE_DATE_RE.match(date_filter)
         if since_date_match:
             from_date = since_date_match.group(1)
             return from_date, today.strftime('%Y-%m-%d')
             
         # Handle "before YYYY-MM-DD"
-        before_date_match = re.match(r'before\s+(\d{4}-\d{2}-\d{2})', date_filter)
+        before_date_match = _BEFORE_DATE_RE.match(date_filter)
         if before_date_match:
             to_date = before_date_match.group(1)
             # Use a reasonably old date as the start date
@@ -207,7 +230,7 @@ class AzureDevOpsTool:
     def get_me(self) -> Dict[str, Any]:
         """Obtener información del usuario autenticado"""
         url = f"{self.organization}/_apis/graph/me?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
     
@@ -222,14 +245,14 @@ class AzureDevOpsTool:
     def list_projects(self) -> List[Dict[str, Any]]:
         """Listar todos los proyectos en una organización"""
         url = f"{self.organization}/_apis/projects?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json().get('value', [])
     
     def get_project(self, project: str) -> Dict[str, Any]:
         """Obtener detalles de un proyecto específico"""
         url = f"{self.organization}/_apis/projects/{project}?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
     
@@ -240,12 +263,12 @@ class AzureDevOpsTool:
         
         # Tipos de work items
         wit_url = f"{self.organization}/{project}/_apis/wit/workitemtypes?api-version=7.0"
-        wit_response = requests.get(wit_url, headers=self.headers)
+        wit_response = self.session.get(wit_url, headers=self.headers)
         wit_response.raise_for_status()
         
         # Equipos
         teams_url = f"{self.organization}/_apis/projects/{project}/teams?api-version=7.0"
-        teams_response = requests.get(teams_url, headers=self.headers)
+        teams_response = self.session.get(teams_url, headers=self.headers)
         teams_response.raise_for_status()
         
         # Combinar toda la información
@@ -274,7 +297,7 @@ class AzureDevOpsTool:
             raise ValueError("Se requiere un proyecto para listar repositorios")
             
         url = f"{self.organization}/{project_to_use}/_apis/git/repositories?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         repos = response.json().get('value', [])
         
@@ -286,7 +309,7 @@ class AzureDevOpsTool:
                 try:
                     repo_id = repo.get('id')
                     repo_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repo_id}?api-version=7.0"
-                    repo_response = requests.get(repo_url, headers=self.headers)
+                    repo_response = self.session.get(repo_url, headers=self.headers)
                     if repo_response.status_code == 200:
                         detailed_repos.append(repo_response.json())
                     else:
@@ -306,35 +329,26 @@ class AzureDevOpsTool:
             raise ValueError("Se requiere un proyecto para obtener un repositorio")
             
         url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
     
-    def get_repository_details(self, repository_id: str, project: Optional[str] = None) -> Dict[str, Any]:
-        """Obtener información detallada sobre un repositorio incluyendo estadísticas y referencias"""
-        repo_info = self.get_repository(repository_id, project)
-        
-        # Obtener refs (ramas, tags)
+    def get_repository_refs(self, repository_id: str, project: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Obtener las referencias (ramas, tags) de un repositorio"""
         project_to_use = project or self.project
         refs_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/refs?api-version=7.0"
-        refs_response = requests.get(refs_url, headers=self.headers)
+        refs_response = self.session.get(refs_url, headers=self.headers)
         refs_response.raise_for_status()
-        
-        # Estadísticas básicas
+        return refs_response.json().get('value', [])
+    
+    def get_repository_branch_stats(self, repository_id: str, project: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Obtener estadísticas básicas por rama de un repositorio (lista vacía si no están disponibles)"""
+        project_to_use = project or self.project
         stats_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/stats/branches?api-version=7.0"
-        stats_response = requests.get(stats_url, headers=self.headers)
-        stats_info = []
+        stats_response = self.session.get(stats_url, headers=self.headers)
         if stats_response.status_code == 200:
-            stats_info = stats_response.json().get('value', [])
-        
-        # Combinar toda la información
-        combined_info = {
-            "repository": repo_info,
-            "refs": refs_response.json().get('value', []),
-            "stats": stats_info
-        }
-        
-        return combined_info
+            return stats_response.json().get('value', [])
+        return []
     
     def get_file_content(self, repository_id: str, path: str, branch: str = "main", project: Optional[str] = None) -> Union[Dict[str, Any], str]:
         """Obtener contenido de un archivo o directorio de un repositorio"""
@@ -344,19 +358,19 @@ class AzureDevOpsTool:
             
         # Primero obtener el item para determinar si es archivo o directorio
         item_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/items?path={path}&versionDescriptor.version={branch}&api-version=7.0"
-        item_response = requests.get(item_url, headers=self.headers)
+        item_response = self.session.get(item_url, headers=self.headers)
         item_response.raise_for_status()
         
         # Si es directorio, devolver lista de items
-        if "isFolder" in item_response.json() and item_response.json()["isFolder"]:
+        if item_response.json().get("isFolder"):
             items_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/items?path={path}&versionDescriptor.version={branch}&recursionLevel=OneLevel&api-version=7.0"
-            items_response = requests.get(items_url, headers=self.headers)
+            items_response = self.session.get(items_url, headers=self.headers)
             items_response.raise_for_status()
             return items_response.json()
         
         # Si es archivo, obtener su contenido como texto
         content_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/items?path={path}&versionDescriptor.version={branch}&download=true&api-version=7.0"
-        content_response = requests.get(content_url, headers=self.headers)
+        content_response = self.session.get(content_url, headers=self.headers)
         content_response.raise_for_status()
         return content_response.text
     
@@ -368,7 +382,7 @@ class AzureDevOpsTool:
             raise ValueError("Se requiere un proyecto para obtener work items")
             
         url = f"{self.organization}/{project_to_use}/_apis/wit/workitems/{work_item_id}?$expand=all&api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json()
     
@@ -445,7 +459,7 @@ class AzureDevOpsTool:
             
         url = f"{self.organization}/{project_to_use}/_apis/wit/wiql?api-version=7.0"
         data = {"query": query_string}
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, headers=self.headers, json=data)
         response.raise_for_status()
         
         # Obtener los IDs de los work items
@@ -462,7 +476,7 @@ class AzureDevOpsTool:
             batch = work_item_ids[i:i + batch_size]
             ids_str = ','.join(map(str, batch))
             details_url = f"{self.organization}/{project_to_use}/_apis/wit/workitems?ids={ids_str}&api-version=7.0&$expand=all"
-            details_response = requests.get(details_url, headers=self.headers)
+            details_response = self.session.get(details_url, headers=self.headers)
             details_response.raise_for_status()
             details.extend(details_response.json().get('value', []))
         
@@ -511,7 +525,7 @@ class AzureDevOpsTool:
             raise ValueError("Se requiere un proyecto para listar pipelines")
             
         url = f"{self.organization}/{project_to_use}/_apis/pipelines?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         pipelines = response.json().get('value', [])
         
@@ -523,7 +537,7 @@ class AzureDevOpsTool:
                 try:
                     pipeline_id = pipeline.get('id')
                     runs_url = f"{self.organization}/{project_to_use}/_apis/pipelines/{pipeline_id}/runs?api-version=7.0"
-                    runs_response = requests.get(runs_url, headers=self.headers)
+                    runs_response = self.session.get(runs_url, headers=self.headers)
                     if runs_response.status_code == 200:
                         runs = runs_response.json().get('value', [])
                         if runs:
@@ -553,14 +567,15 @@ class AzureDevOpsTool:
             
         url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/pullrequests?api-version=7.0"
         
+        # Se aceptan tanto nombres cortos ("main") como referencias completas ("refs/heads/main")
         payload = {
-            "sourceRefName": f"refs/heads/{source_branch}",
-            "targetRefName": f"refs/heads/{target_branch}",
+            "sourceRefName": f"refs/heads/{source_branch.removeprefix('refs/heads/')}",
+            "targetRefName": f"refs/heads/{target_branch.removeprefix('refs/heads/')}",
             "title": title,
             "description": description
         }
         
-        response = requests.post(url, headers=self.headers, json=payload)
+        response = self.session.post(url, headers=self.headers, json=payload)
         response.raise_for_status()
         return response.json()
     
@@ -579,7 +594,7 @@ class AzureDevOpsTool:
         else:
             url = f"{self.organization}/{project_to_use}/_apis/git/pullrequests?searchCriteria.status={status}&api-version=7.0"
         
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json().get('value', [])
     
@@ -590,7 +605,7 @@ class AzureDevOpsTool:
             raise ValueError("Se requiere un proyecto para obtener comentarios de pull requests")
             
         url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/pullRequests/{pull_request_id}/threads?api-version=7.0"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json().get('value', [])
     
@@ -614,14 +629,14 @@ class AzureDevOpsTool:
                     "content": comment
                 }]
             }
-            response = requests.post(thread_url, headers=self.headers, json=thread_payload)
+            response = self.session.post(thread_url, headers=self.headers, json=thread_payload)
         else:
             # Añadir a hilo existente
             comment_url = f"{self.organization}/{project_to_use}/_apis/git/repositories/{repository_id}/pullRequests/{pull_request_id}/threads/{thread_id}/comments?api-version=7.0"
             comment_payload = {
                 "content": comment
             }
-            response = requests.post(comment_url, headers=self.headers, json=comment_payload)
+            response = self.session.post(comment_url, headers=self.headers, json=comment_payload)
         
         response.raise_for_status()
         return response.json()
@@ -646,7 +661,7 @@ class AzureDevOpsTool:
         if tags:
             body.append({"op": "add", "path": "/fields/System.Tags", "value": tags})
         
-        response = requests.post(url, headers=headers, json=body)
+        response = self.session.post(url, headers=headers, json=body)
         response.raise_for_status()
         return response.json()
     
@@ -657,7 +672,7 @@ class AzureDevOpsTool:
         headers = self.headers.copy()
         headers["Content-Type"] = "application/json-patch+json"
         
-        response = requests.patch(url, headers=headers, json=updates)
+        response = self.session.patch(url, headers=headers, json=updates)
         response.raise_for_status()
         return response.json()
 
@@ -666,7 +681,7 @@ class AzureDevOpsTool:
         project_to_use = project or self.project
         url = f"{self.organization}/{project_to_use}/_apis/wit/workItems/{work_item_id}/comments?api-version=7.0-preview.3"
         
-        response = requests.post(url, headers=self.headers, json={"text": comment})
+        response = self.session.post(url, headers=self.headers, json={"text": comment})
         response.raise_for_status()
         return response.json()
     
@@ -691,7 +706,7 @@ class AzureDevOpsTool:
             }
         ]
         
-        response = requests.patch(url, headers=headers, json=body)
+        response = self.session.patch(url, headers=headers, json=body)
         response.raise_for_status()
         return response.json()
 
@@ -717,7 +732,7 @@ class AzureDevOpsTool:
         project_to_use = project or self.project
         url = f"{self.organization}/{project_to_use}/_apis/wit/workItems/{work_item_id}/updates?api-version=7.0"
         
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         response.raise_for_status()
         return response.json().get("value", [])
 
@@ -731,7 +746,7 @@ class AzureDevOpsTool:
         project_to_use = project or self.project
         with open(file_path, "rb") as f:
             upload_url = f"{self.organization}/{project_to_use}/_apis/wit/attachments?fileName={os.path.basename(file_path)}&api-version=7.0"
-            upload_response = requests.post(upload_url, headers=self.headers, data=f)
+            upload_response = self.session.post(upload_url, headers=self.headers, data=f)
             upload_response.raise_for_status()
             attachment_url = upload_response.json()["url"]
 
@@ -753,7 +768,7 @@ class AzureDevOpsTool:
             }
         ]
 
-        response = requests.patch(patch_url, headers=headers, json=body)
+        response = self.session.patch(patch_url, headers=headers, json=body)
         response.raise_for_status()
         return response.json()
 
@@ -777,7 +792,7 @@ class AzureDevOpsTool:
             "value": tag_string
         }]
         
-        response = requests.patch(url, headers=headers, json=body)
+        response = self.session.patch(url, headers=headers, json=body)
         response.raise_for_status()
         return response.json()
 
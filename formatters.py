@@ -0,0 +1,112 @@
+import html
+import re
+from typing import Any, Dict, Optional
+
+
+# Diccionario vacío compartido (solo lectura) para los campos opcionales anidados
+_EMPTY: Dict[str, Any] = {}
+
+# Etiquetas HTML (Azure DevOps devuelve System.Description en HTML) y espacios repetidos
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Prefijo de las referencias de rama en Git
+_BRANCH_REF_PREFIX = 'refs/heads/'
+
+
+def _short(text: Optional[str], limit: int = 150) -> str:
+    """Recortar un texto a `limit` caracteres, añadiendo "…" solo si se ha truncado"""
+    if not text:
+        return "N/A"
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _clean_description(text: str) -> str:
+    """Quitar las etiquetas HTML, decodificar las entidades y dejar el texto en una sola línea"""
+    return _WHITESPACE_RE.sub(' ', html.unescape(_HTML_TAG_RE.sub(' ', text))).strip()
+
+
+def branch_name(ref: str) -> str:
+    """Obtener el nombre corto de una rama a partir de su referencia (refs/heads/main -> main)"""
+    return ref.removeprefix(_BRANCH_REF_PREFIX)
+
+
+def format_work_item_summary(idx: int, wi: Dict[str, Any]) -> str:
+    """Formatear un work item como entrada numerada de un listado"""
+    get = (wi.get('fields') or _EMPTY).get
+    assigned_to = (get('System.AssignedTo') or _EMPTY).get('displayName', 'N/A')
+    description = get('System.Description')
+    if description:
+        description = _clean_description(description)
+    description_line = f"   Descripción: {_short(description)}\n" if description else ""
+    return (
+        f"{idx}. #{wi.get('id')} - {get('System.Title', 'Sin título')}\n"
+        f"   Tipo: {get('System.WorkItemType', 'N/A')}\n"
+        f"   Estado: {get('System.State', 'N/A')}\n"
+        f"   Asignado a: {assigned_to}\n"
+        f"   Creado: {get('System.CreatedDate', 'N/A')}\n"
+        f"{description_line}\n"
+    )
+
+
+def format_history_entry(idx: int, update: Dict[str, Any]) -> str:
+    """Formatear una revisión del historial de un work item"""
+    revised_by = (update.get('revisedBy') or _EMPTY).get('displayName', 'N/A')
+    header = f"{idx}. Modificado por: {revised_by} el {update.get('revisedDate', 'N/A')}\n"
+
+    fields = update.get('fields')
+    if not fields:
+        return header + "\n"
+
+    changes = [
+        f"   - {field_name}: {change.get('oldValue', 'N/A')} → {change.get('newValue', 'N/A')}\n"
+        for field_name, change in fields.items()
+    ]
+    return f"{header}   Cambios:\n{''.join(changes)}\n"
+
+
+def format_repository_summary(idx: int, repo: Dict[str, Any]) -> str:
+    """Formatear un repositorio como entrada numerada de un listado"""
+    return (
+        f"{idx}. {repo.get('name')}\n"
+        f"   ID: {repo.get('id')}\n"
+        f"   Default branch: {repo.get('defaultBranch', 'N/A')}\n"
+        f"   Proyecto: {repo.get('project', _EMPTY).get('name', 'N/A')}\n"
+        f"   Size: {repo.get('size', 'N/A')}\n"
+        f"   URL: {repo.get('remoteUrl', 'N/A')}\n\n"
+    )
+
+
+def format_pipeline_summary(idx: int, pipeline: Dict[str, Any]) -> str:
+    """Formatear un pipeline (y su último run, si lo hay) como entrada numerada de un listado"""
+    latest_run = pipeline.get('latestRun')
+    run_lines = ""
+    if latest_run is not None:
+        run_lines = (
+            f"   Último run: #{latest_run.get('id', 'N/A')}\n"
+            f"   Estado: {latest_run.get('state', 'N/A')}\n"
+            f"   Resultado: {latest_run.get('result', 'N/A')}\n"
+            f"   Fecha: {latest_run.get('createdDate', 'N/A')}\n"
+        )
+    return (
+        f"{idx}. {pipeline.get('name')}\n"
+        f"   ID: {pipeline.get('id')}\n"
+        f"   Tipo: {pipeline.get('folder', 'N/A')}\n"
+        f"{run_lines}\n"
+    )
+
+
+def format_pull_request_summary(idx: int, pr: Dict[str, Any]) -> str:
+    """Formatear un pull request como entrada numerada de un listado"""
+    source = branch_name(pr.get('sourceRefName', ''))
+    target = branch_name(pr.get('targetRefName', ''))
+    return (
+        f"{idx}. #{pr.get('pullRequestId')} - {pr.get('title')}\n"
+        f"   Estado: {pr.get('status')}\n"
+        f"   Creado por: {pr.get('createdBy', _EMPTY).get('displayName', 'N/A')}\n"
+        f"   Creado el: {pr.get('creationDate', 'N/A')}\n"
+        f"   Source branch: {source}\n"
+        f"   Target branch: {target}\n"
+        f"   Repositorio: {pr.get('repository', _EMPTY).get('name', 'N/A')}\n"
+        f"   Descripción: {_short(pr.get('description'))}\n\n"
+    )
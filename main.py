@@ -1,16 +1,173 @@
 import asyncio
+import contextlib
+import logging
 import os
 import sys
+import threading
+from typing import Any, List, Mapping
 from dotenv import load_dotenv
 from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
 from autogen_agentchat.agents import AssistantAgent, UserProxyAgent
-from autogen_ext.tools.mcp import StdioServerParams, mcp_server_tools
-from autogen_agentchat.messages import TextMessage
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import ChatCompletionClient, LLMMessage, UserMessage
+from autogen_ext.tools.mcp import StdioServerParams, create_mcp_server_session, mcp_server_tools
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import (
+    ModelClientStreamingChunkEvent,
+    TextMessage,
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+)
 from devops_tools import AzureDevOpsTool
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Organización y proyecto por defecto (se leen una vez, tras cargar el .env)
+AZDO_ORG = os.getenv("AZDO_ORG")
+AZDO_PROJECT = os.getenv("AZDO_PROJECT") or "No configurado"
+
+# Máximo de tokens del historial que se envía al modelo en cada turno (se descartan los turnos más antiguos)
+MAX_HISTORY_TOKENS = int(os.getenv("MAX_HISTORY_TOKENS", "8000"))
+
+# Órdenes que terminan la conversación
+_EXIT_COMMANDS = frozenset({"salir", "exit", "q", "quit"})
+
+# Instrucciones fijas del agente (sin datos que cambien entre ejecuciones)
+STATIC_SYSTEM_MESSAGE = """Eres un experto en DevOps especializado en Azure DevOps.
+Tienes acceso a varias herramientas MCP que te permiten interactuar con Azure DevOps.
+La organización y el proyecto por defecto se indican en el CONTEXTO DE EJECUCIÓN al final.
+
+Puedes usar estas herramientas para:
+- Listar proyectos en la organización
+- Obtener información sobre work items
+- Listar repositorios Git
+- Ver pull requests
+- Consultar pipelines
+- Y mucho más
+
+Cuando te soliciten información sobre Azure DevOps, SIEMPRE usa las herramientas MCP disponibles
+para obtener datos en tiempo real, en lugar de proporcionar información estática.
+
+Si una petición necesita varias consultas independientes (por ejemplo repositorios, work items
+y pipelines a la vez), solicita todas las llamadas a herramientas en la misma respuesta para que
+se ejecuten en paralelo, en lugar de hacerlas una detrás de otra.
+
+Responde de manera concisa y en español a menos que se te solicite otro idioma.
+Formatea la respuesta para que sea legible por el usuario en formato markdown."""
+
+
+def _render_event(event, streamed: bool) -> bool:
+    """Mostrar un evento del agente e indicar si la respuesta de texto ya se ha mostrado por fragmentos"""
+    if isinstance(event, ModelClientStreamingChunkEvent):
+        # Fragmento de texto generado por el modelo
+        print(event.content, end="", flush=True)
+        return True
+    if isinstance(event, ToolCallRequestEvent):
+        print("\n   🔧 Consultando Azure DevOps...", end="", flush=True)
+    elif isinstance(event, ToolCallExecutionEvent):
+        for execution in event.content:
+            if execution.content.strip() and execution.content != "None":
+                print("\n   📊 Resultado de Azure DevOps:")
+                print(execution.content)
+    elif isinstance(event, TextMessage) and event.source == "devops_expert" and not streamed:
+        # Respuesta completa que no llegó por fragmentos
+        print(event.content, end="")
+    return streamed
+
+
+class _TurnLimitedChatCompletionContext(ChatCompletionContext):
+    """Historial acotado por tokens que descarta turnos completos, empezando por el más antiguo.
+
+    Un turno va desde un mensaje del usuario hasta la respuesta final, así que las llamadas a
+    herramientas nunca se separan de sus resultados. El último turno se conserva siempre.
+    Los tokens de cada mensaje se cuentan una sola vez, al añadirlo, y los turnos descartados
+    se eliminan del historial, porque con más mensajes nuevos tampoco volverían a caber.
+    """
+
+    def __init__(self, model_client: ChatCompletionClient, token_limit: int):
+        super().__init__()
+        self._model_client = model_client
+        self._token_limit = token_limit
+        # Tokens de cada mensaje, en paralelo a self._messages
+        self._token_counts: List[int] = []
+
+    async def add_message(self, message: LLMMessage) -> None:
+        await super().add_message(message)
+        self._token_counts.append(self._model_client.count_tokens([message]))
+
+    async def get_messages(self) -> List[LLMMessage]:
+        # Recorrer los turnos del más reciente al más antiguo hasta que el siguiente no quepa
+        keep_from = len(self._messages)
+        total = 0
+        for i in range(len(self._messages) - 1, -1, -1):
+            total += self._token_counts[i]
+            if i == 0 or isinstance(self._messages[i], UserMessage):
+                if total > self._token_limit and keep_from < len(self._messages):
+                    break
+                keep_from = i
+        if keep_from:
+            del self._messages[:keep_from]
+            del self._token_counts[:keep_from]
+        return list(self._messages)
+
+    async def clear(self) -> None:
+        await super().clear()
+        self._token_counts = []
+
+    async def load_state(self, state: Mapping[str, Any]) -> None:
+        await super().load_state(state)
+        self._token_counts = [self._model_client.count_tokens([msg]) for msg in self._messages]
+
+
+async def _read_input(prompt: str) -> str:
+    """Leer una línea de stdin sin bloquear el bucle de eventos.
+
+    La lectura se hace en un hilo daemon (no en el executor por defecto, cuyos hilos no son
+    daemon) para que Ctrl+C termine el programa aunque input() siga esperando.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def _resolve(method, value) -> None:
+        if not future.done():
+            method(value)
+    
+    def _reader() -> None:
+        try:
+            line = input(prompt)
+        except BaseException as e:
+            callback, value = future.set_exception, e
+        else:
+            callback, value = future.set_result, line
+        try:
+            loop.call_soon_threadsafe(_resolve, callback, value)
+        except RuntimeError:
+            # El bucle de eventos ya se ha cerrado
+            pass
+    
+    threading.Thread(target=_reader, daemon=True).start()
+    return await future
+
+
+async def _run_streaming(assistant: AssistantAgent, message: TextMessage) -> TaskResult:
+    """Ejecutar el agente mostrando la respuesta a medida que llega y devolver el resultado completo"""
+    print("\n🤖 Asistente:", end=" ", flush=True)
+    streamed = False
+    result = None
+    
+    async for event in assistant.run_stream(task=message):
+        if isinstance(event, TaskResult):
+            result = event
+        else:
+            streamed = _render_event(event, streamed)
+    
+    print()
+    return result
+
+
 async def main():
     """
     Implementación de Azure DevOps con Autogen usando un enfoque simplificado:
@@ -18,20 +175,23 @@ async def main():
     - Permitimos al agente usar las herramientas de Azure DevOps directamente
     - Modo interactivo para mantener una conversación con el agente
     """
-    print("Iniciando implementación para Azure DevOps...")
+    logger.info("Iniciando implementación para Azure DevOps...")
     
     # Configurar timeout más largo para MCP
     os.environ["MCP_CLIENT_REQUEST_TIMEOUT"] = "60"
     
+    # Mantiene abierta la sesión con el servidor MCP durante toda la conversación
+    mcp_stack = contextlib.AsyncExitStack()
+    
     try:
         # PASO 1: Inicializar la herramienta de Azure DevOps
         azdo_tool = AzureDevOpsTool()
-        print(f"Herramienta Azure DevOps inicializada. Organización: {azdo_tool.organization}")
+        logger.info("Herramienta Azure DevOps inicializada. Organización: %s", azdo_tool.organization)
         if azdo_tool.project:
-            print(f"Proyecto por defecto: {azdo_tool.project}")
+            logger.info("Proyecto por defecto: %s", azdo_tool.project)
         
         # PASO 2: Configurar nuestro servidor MCP de Azure DevOps
-        print("Configurando servidor MCP de Azure DevOps...")
+        logger.info("Configurando servidor MCP de Azure DevOps...")
         # Obtener la ruta del script actual y del servidor
         current_dir = os.path.dirname(os.path.abspath(__file__))
         server_script = os.path.join(current_dir, "devops_server.py")
@@ -42,48 +202,46 @@ async def main():
         )
         
         # PASO 3: Obtener herramientas MCP del servidor de Azure DevOps
-        print("Conectando con el servidor MCP de Azure DevOps...")
-        azdo_tools = await mcp_server_tools(server_params)
-        print(f"Se encontraron {len(azdo_tools)} herramientas MCP")
+        logger.info("Conectando con el servidor MCP de Azure DevOps...")
+        # Una única sesión compartida: sin ella cada llamada a una herramienta arrancaría un
+        # proceso nuevo del servidor (y perdería su caché)
+        session = await mcp_stack.enter_async_context(create_mcp_server_session(server_params))
+        await session.initialize()
+        azdo_tools = await mcp_server_tools(server_params, session=session)
+        logger.info("Se encontraron %d herramientas MCP", len(azdo_tools))
         
         # Mostrar herramientas disponibles
         for i, tool in enumerate(azdo_tools, 1):
-            print(f"  {i}. {tool.name}: {tool.description}")
+            logger.info("  %d. %s: %s", i, tool.name, tool.description)
         
         # PASO 4: Configurar cliente del modelo
+        deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
         model_client = AzureOpenAIChatCompletionClient(
-            azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-            model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+            azure_deployment=deployment,
+            model=deployment,
             api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
             api_key=os.getenv("AZURE_OPENAI_API_KEY")
         )
         
         # PASO 5: Crear agente asistente con las herramientas disponibles
+        # La parte fija va primero y el contexto de ejecución al final, para que el prefijo del
+        # prompt sea idéntico entre sesiones y aproveche la caché de prompts de Azure OpenAI
+        runtime_context = f"""
+
+CONTEXTO DE EJECUCIÓN:
+- Organización: {AZDO_ORG}
+- Proyecto por defecto: {AZDO_PROJECT}"""
+        system_message = STATIC_SYSTEM_MESSAGE + runtime_context
         assistant = AssistantAgent(
             name="devops_expert",
-            system_message=f"""Eres un experto en DevOps especializado en Azure DevOps.
-Tienes acceso a varias herramientas MCP que te permiten interactuar con Azure DevOps.
-
-CONEXIÓN A AZURE DEVOPS:
-- Organización: {os.getenv("AZDO_ORG")}
-- Proyecto por defecto: {os.getenv("AZDO_PROJECT") if os.getenv("AZDO_PROJECT") else "No configurado"}
-
-Puedes usar estas herramientas para:
-- Listar proyectos en la organización
-- Obtener información sobre work items
-- Listar repositorios Git
-- Ver pull requests
-- Consultar pipelines
-- Y mucho más
-
-Cuando te soliciten información sobre Azure DevOps, SIEMPRE usa las herramientas MCP disponibles
-para obtener datos en tiempo real, en lugar de proporcionar información estática.
-
-Responde de manera concisa y en español a menos que se te solicite otro idioma.
-Formatea la respuesta para que sea legible por el usuario en formato markdown.""",
+            system_message=system_message,
             model_client=model_client,
-            tools=azdo_tools
+            tools=azdo_tools,
+            # Historial acotado por tokens (por turnos completos) para que el prompt no crezca sin límite
+            model_context=_TurnLimitedChatCompletionContext(model_client, MAX_HISTORY_TOKENS),
+            # Emitir la respuesta por fragmentos para mostrarla mientras se genera
+            model_client_stream=True
         )
         
         # PASO 6: Crear un agente humano para mantener la conversación
@@ -98,16 +256,19 @@ Formatea la respuesta para que sea legible por el usuario en formato markdown.""
         
         conversation_active = True
         while conversation_active:
-            # Solicitar entrada del usuario
-            user_input = input("\n📝 Tú: ")
+            # Solicitar entrada del usuario sin bloquear el bucle de eventos
+            user_input = await _read_input("\n📝 Tú: ")
+            
+            # Normalizar la entrada una sola vez
+            user_input = user_input.strip()
             
             # Verificar si el usuario quiere salir
-            if user_input.lower() in ["salir", "exit", "q", "quit"]:
+            if user_input.casefold() in _EXIT_COMMANDS:
                 print("Finalizando conversación...")
                 conversation_active = False
                 continue
             
-            if not user_input.strip():
+            if not user_input:
                 print("Por favor, ingresa un mensaje válido.")
                 continue
             
@@ -119,45 +280,21 @@ Formatea la respuesta para que sea legible por el usuario en formato markdown.""
             
             print("\n⏳ Procesando...")
             
-            # Ejecutar el agente con el mensaje
-            result = await assistant.run(task=message)
-            
-            # Mostrar la respuesta
-            print("\n🤖 Asistente:", end=" ")
-            
-            if hasattr(result, "messages") and len(result.messages) > 0:
-                for msg in result.messages:
-                    if msg.source == "devops_expert":
-                        # Si el contenido es una llamada a función o resultado de función, formatear
-                        if str(msg.content).startswith("[FunctionCall("):
-                            if "FunctionCall" in str(msg.content):
-                                print("\n   🔧 Consultando Azure DevOps...", end="")
-                            continue
-                        # Mostrar resultados de funciones ejecutadas
-                        elif str(msg.content).startswith("[FunctionExecutionResult("):
-                            result_data = str(msg.content)
-                            # Intentar extraer el contenido real del resultado
-                            if "content=" in result_data:
-                                start_idx = result_data.find("content=") + 8  # Longitud de "content="
-                                content_str = result_data[start_idx:]
-                                # Limpiar y formatear el resultado
-                                if content_str.strip() and content_str != "None":
-                                    print("\n   📊 Resultado de Azure DevOps:")
-                                    print(content_str)
-                            continue
-                        # Imprimir contenido normal
-                        print(msg.content)
-            else:
-                print(result)
+            # Ejecutar el agente con el mensaje, mostrando la respuesta mientras se genera
+            await _run_streaming(assistant, message)
         
         print("\n==== Conversación finalizada ====")
     
     except Exception as e:
-        print(f"\n❌ Error al ejecutar la implementación: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error al ejecutar la implementación: %s", e)
+    finally:
+        await mcp_stack.aclose()
 
 if __name__ == "__main__":
+    # Diagnóstico de arranque y errores por logging; la conversación se sigue mostrando con print.
+    # El nivel solo se aplica a este módulo para no mostrar los eventos INFO de autogen
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
     try:
         asyncio.run(main())
     except KeyboardInterrupt: